@@ -1,33 +1,81 @@
+import fnmatch
+from mlflow.exceptions import MlflowException
 from mlflow_export_import.common.iterators import SearchRegisteredModelsIterator
 from mlflow_export_import.common.iterators import SearchExperimentsIterator
+from mlflow_export_import.common.iterators import DEFAULT_PREFETCH
+
+_GLOB_CHARS = "*?["
+
+
+def _is_pattern(name):
+    return any(c in name for c in _GLOB_CHARS)
+
+
+def _mk_like_filter(pattern):
+    """
+    Returns the tightest server-side 'name LIKE' filter for a glob pattern or None if the server cannot narrow it.
+    '*' and '?' map to '%' and '_'. A character class ('[...]') ends the filter with '%'.
+    The filter can match more names than the pattern (e.g. '_' in a name) so matches are checked with the pattern.
+    """
+    if "'" in pattern:
+        return None
+    like = ""
+    for c in pattern:
+        if c == "[":
+            like += "%"
+            break
+        like += "%" if c == "*" else "_" if c == "?" else c
+    if like.replace("%", "") == "":
+        return None
+    return f"name LIKE '{like}'"
+
+
+def _search(pattern, func_list):
+    filter = _mk_like_filter(pattern)
+    entities = None
+    if filter:
+        try:
+            entities = func_list(filter)
+        except MlflowException as e:
+            print(f"WARNING: Server-side filter \"{filter}\" failed. Listing all entities. {e}")
+    if entities is None:
+        entities = func_list(None)
+    return [ key for key,name in entities if fnmatch.fnmatchcase(name, pattern) ]
 
 
 def _get_list(names, func_list):
     """
     Returns a list of entities specified by the 'names' filter.
-    :param names: Filter of desired list of entities. Can be: "all", comma-delimited string, list of entities or trailing wildcard "*".
-    :param func_list: Function that lists the entities primary keys - for experiments it is experiment_id, for registered models it is model name.
+    :param names: Filter of desired list of entities. Can be: "all", comma-delimited string, list of entities or
+                  glob patterns such as "sklearn*" or "team_?_*". Patterns are matched against entity names and are
+                  searched with a server-side 'name LIKE' filter when possible.
+    :param func_list: Function of a server-side filter string (or None for all) that lists the entities as
+                      tuples of primary key and name - for experiments the key is experiment_id, for registered models it is model name.
     :return: List of entities.
     """
     if isinstance(names, str):
         if names == "all":
-            return func_list()
-        elif names.endswith("*"):
-            prefix = names[:-1]
-            return [ x for x in func_list() if x.startswith(prefix) ] 
-        else:
-            return names.split(",")
+            return [ key for key,_ in func_list(None) ]
+        keys, seen = [], set()
+        for name in names.split(","):
+            for key in _search(name, func_list) if _is_pattern(name) else [ name ]:
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+        return keys
     else:
         return names
 
 
 def get_experiment_ids(mlflow_client, experiment_ids):
-    def list_entities():
-        return [ exp.experiment_id for exp in SearchExperimentsIterator(mlflow_client) ]
+    def list_entities(filter):
+        with SearchExperimentsIterator(mlflow_client, filter=filter, prefetch=DEFAULT_PREFETCH) as exps:
+            return [ (exp.experiment_id, exp.name) for exp in exps ]
     return _get_list(experiment_ids, list_entities)
 
 
 def get_model_names(mlflow_client, model_names):
-    def list_entities():
-        return [ model.name for model in SearchRegisteredModelsIterator(mlflow_client) ]
+    def list_entities(filter):
+        with SearchRegisteredModelsIterator(mlflow_client, filter=filter, prefetch=DEFAULT_PREFETCH) as models:
+            return [ (model.name, model.name) for model in models ]
     return _get_list(model_names, list_entities)
@@ -7,54 +7,105 @@ import time
 import click
 import mlflow
 
-from mlflow_export_import.common.click_options import opt_output_dir, opt_notebook_formats, opt_use_threads
-from mlflow_export_import.common import io_utils
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_output_dir, opt_notebook_formats, opt_use_threads, \
+    opt_use_pipeline, opt_pipeline_workers, opt_incremental, opt_resume
+from mlflow_export_import.common import io_utils, utils
+from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.bulk import export_state
 from mlflow_export_import.bulk.export_models import export_models
 from mlflow_export_import.bulk.export_experiments import export_experiments
+from mlflow_export_import.bulk.export_all_pipeline import ExportAllPipeline, parse_pipeline_workers
 
 ALL_STAGES = "Production,Staging,Archived,None" 
 
 
-def export_all(output_dir, notebook_formats=None, use_threads=False):
+def export_all(output_dir, notebook_formats=None, use_threads=False, use_pipeline=False, pipeline_workers=None, incremental=False, resume=False):
+    """
+    :param use_pipeline: Export with a staged pipeline instead of exporting models and then experiments.
+    :param pipeline_workers: Number of workers per pipeline stage - a dictionary or a string such as 'metadata=8,artifacts=8'.
+    :param incremental: Only export what was created or updated since the previous export into output_dir.
+    :param resume: Resume a previous export into output_dir that did not complete.
+    """
+    if (incremental or resume) and use_pipeline:
+        raise MlflowExportImportException("Options 'incremental' and 'resume' cannot be set with 'use_pipeline'", http_status_code=400)
     start_time = time.time()
+    high_water_mark = export_state.now_millis()
+    since = export_state.read_high_water_mark(output_dir) if incremental else None
     client = mlflow.tracking.MlflowClient()
-    res_models = export_models(
-        client,
-        model_names="all", 
-        output_dir=output_dir,
-        notebook_formats=notebook_formats, 
-        stages=ALL_STAGES, 
-        use_threads=use_threads)
-    res_exps = export_experiments(
-        client,
-        experiments="all",
-        output_dir=os.path.join(output_dir,"experiments"),
-        notebook_formats=notebook_formats,
-        use_threads=use_threads)
+    if use_pipeline:
+        if not isinstance(pipeline_workers, dict):
+            pipeline_workers = parse_pipeline_workers(pipeline_workers)
+        pipeline = ExportAllPipeline(client,
+            notebook_formats=utils.string_to_list(notebook_formats),
+            stages=ALL_STAGES,
+            workers=pipeline_workers)
+        res_exps, res_models = pipeline.export_all(output_dir)
+    else:
+        res_exps, res_models = _export_all(client, output_dir, notebook_formats, use_threads, since, resume)
     duration = round(time.time() - start_time, 1)
 
     info_attr = {
         "stages": ALL_STAGES,
         "notebook_formats": notebook_formats,
         "use_threads": use_threads,
+        "use_pipeline": use_pipeline,
+        "pipeline_workers": pipeline_workers,
+        "incremental": incremental,
+        "since": since,
+        "resume": resume,
         "output_dir": output_dir,
         "duration": duration,
         "models": res_models,
         "experiments": res_exps
     }
     io_utils.write_export_file(output_dir, "manifest.json", __file__, {}, info_attr)
+    if incremental:
+        export_state.write_high_water_mark(output_dir, high_water_mark)
     print(f"Duration for entire tracking server export: {duration} seconds")
 
 
+def _export_all(client, output_dir, notebook_formats, use_threads, since, resume):
+    res_models = export_models(
+        client,
+        model_names="all", 
+        output_dir=output_dir,
+        notebook_formats=notebook_formats, 
+        stages=ALL_STAGES, 
+        use_threads=use_threads,
+        since=since,
+        resume=resume)
+    # Resume from the journal of the models export so the runs of model versions are not exported twice
+    res_exps = export_experiments(
+        client,
+        experiments="all",
+        output_dir=os.path.join(output_dir,"experiments"),
+        notebook_formats=notebook_formats,
+        use_threads=use_threads,
+        since=since,
+        resume=True)
+    return res_exps, res_models
+
+
 @click.command()
 @opt_output_dir
 @opt_notebook_formats
 @opt_use_threads
-def main(output_dir, notebook_formats, use_threads):
+@opt_use_pipeline
+@opt_pipeline_workers
+@opt_incremental
+@opt_resume
+@opt_max_rates
+def main(output_dir, notebook_formats, use_threads, use_pipeline, pipeline_workers, incremental, resume, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
-    export_all(output_dir, notebook_formats, use_threads)
+    rate_limiter.configure_max_rates(max_rates)
+    export_all(output_dir, notebook_formats, use_threads,
+        use_pipeline=use_pipeline,
+        pipeline_workers=pipeline_workers,
+        incremental=incremental,
+        resume=resume)
 
 
 if __name__ == "__main__":
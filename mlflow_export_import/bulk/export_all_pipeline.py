@@ -0,0 +1,281 @@
+"""
+Export the entire tracking server with a staged pipeline.
+
+Instead of exporting models and then experiments one run at a time, the work is split into stages
+connected by bounded queues, each stage with its own number of workers:
+  - listing: enumerate the runs of each experiment
+  - metadata: write run.json of each run and export each registered model
+  - artifacts: download the artifacts of each run
+  - notebooks: download the Databricks notebook of each run
+  - manifests: write experiment.json of each experiment once all its runs are done
+Network-bound and disk-bound stages overlap so the total time is set by the slowest stage.
+"""
+
+import os
+import time
+import traceback
+
+from mlflow_export_import.common import io_utils
+from mlflow_export_import.client import http_client
+from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common.iterators import SearchExperimentsIterator, SearchRegisteredModelsIterator, SearchRunsIterator, \
+    DEFAULT_PREFETCH
+from mlflow_export_import.common.pipeline import Pipeline, Stage
+from mlflow_export_import.common.metadata_cache import MetadataCache
+from mlflow_export_import.experiment.export_experiment import write_experiment_export_file
+from mlflow_export_import.model.export_model import ModelExporter
+from mlflow_export_import.run.export_run import RunExporter
+
+STAGES = [ "listing", "metadata", "artifacts", "notebooks" ]
+DEFAULT_WORKERS = { "listing": 1, "metadata": 4, "artifacts": 4, "notebooks": 2 }
+
+
+def parse_pipeline_workers(workers):
+    """
+    :param workers: Comma-delimited stage worker counts such as 'metadata=8,artifacts=8'.
+                    Stages not specified keep their default worker count.
+    :return: Dictionary of stage name to number of workers.
+    """
+    dct = dict(DEFAULT_WORKERS)
+    if not workers:
+        return dct
+    for entry in workers.split(","):
+        stage, _, num = entry.partition("=")
+        stage = stage.strip()
+        if stage not in dct or not num.strip().isdigit() or int(num) < 1:
+            raise MlflowExportImportException(
+                f"Bad pipeline worker count '{entry}'. Format is 'stage=N' with stage one of {STAGES}.",
+                http_status_code=400)
+        dct[stage] = int(num)
+    return dct
+
+
+class _Experiment():
+    def __init__(self, exp, output_dir):
+        self.exp = exp
+        self.output_dir = output_dir
+        self.start_time = time.time()
+        self.num_runs = None # set once all runs are listed
+        self.results = {}
+        self.error = None # set if listing the runs or writing experiment.json failed
+        self.done = False
+
+
+class _Task():
+    def __init__(self, kind, name=None, exp=None, run=None, idx=None):
+        """
+        :param kind: 'experiment', 'run' or 'model'. An 'experiment' task follows the
+                     experiment's run tasks and marks the end of its listing.
+        """
+        self.kind = kind
+        self.name = name
+        self.exp = exp
+        self.run = run
+        self.idx = idx
+        self.ok = True
+
+
+class ExportAllPipeline():
+
+    def __init__(self, mlflow_client, notebook_formats=None, stages="", workers=None, queue_size=100):
+        """
+        :param mlflow_client: MLflow client.
+        :param notebook_formats: List of notebook formats to export. Values are SOURCE, HTML, JUPYTER or DBC.
+        :param stages: Registered model version stages to export.
+        :param workers: Dictionary of stage name to number of workers.
+        :param queue_size: Maximum number of items queued in front of each stage.
+        """
+        self.mlflow_client = mlflow_client
+        self.workers = { **DEFAULT_WORKERS, **(workers or {}) }
+        http_client.set_pool_size(sum(self.workers.values()))
+        self.queue_size = queue_size
+        self.notebook_formats = notebook_formats
+        self.stages = stages
+        self.metadata_cache = MetadataCache(mlflow_client)
+        self.run_exporter = RunExporter(mlflow_client, notebook_formats=notebook_formats, metadata_cache=self.metadata_cache)
+        self.model_exporter = ModelExporter(mlflow_client, notebook_formats=notebook_formats, stages=stages, export_run=False,
+            metadata_cache=self.metadata_cache)
+        self.exps_dir = None
+        self.models_dir = None
+
+
+    def export_all(self, output_dir):
+        """
+        :return: Experiment and model results in the format of bulk export_experiments and export_models.
+        """
+        start_time = time.time()
+        self.exps_dir = os.path.join(output_dir, "experiments")
+        self.models_dir = os.path.join(output_dir, "models")
+        pipeline = Pipeline([
+            Stage("listing", self._list, self.workers["listing"]),
+            Stage("metadata", self._export_metadata, self.workers["metadata"]),
+            Stage("artifacts", self._export_artifacts, self.workers["artifacts"]),
+            Stage("notebooks", self._export_notebook, self.workers["notebooks"]),
+            Stage("manifests", self._write_manifest, 1)
+        ], self.queue_size)
+
+        exp_results, ok_models, failed_models = [], [], []
+        for kind, result in pipeline.run(self._enumerate()):
+            if kind == "experiment":
+                exp_results.append(result)
+            elif result[0]:
+                ok_models.append(result[1])
+            else:
+                failed_models.append(result[1])
+        duration = round(time.time()-start_time, 1)
+
+        res_exps = self._write_experiments_file(exp_results, duration)
+        res_models = self._write_models_file(ok_models, failed_models, duration)
+        self.metadata_cache.report()
+        if pipeline.errors:
+            print(f"WARNING: {len(pipeline.errors)} pipeline errors: {pipeline.errors}")
+        return res_exps, res_models
+
+
+    def _enumerate(self):
+        with SearchRegisteredModelsIterator(self.mlflow_client, prefetch=DEFAULT_PREFETCH) as models:
+            for model in models:
+                yield _Task("model", name=model.name)
+        with SearchExperimentsIterator(self.mlflow_client, prefetch=DEFAULT_PREFETCH) as exps:
+            for exp in exps:
+                yield _Task("experiment", exp=_Experiment(exp, os.path.join(self.exps_dir, exp.experiment_id)))
+
+
+    # == Stages
+
+    def _list(self, task):
+        if task.kind != "experiment":
+            return [ task ]
+        return self._list_runs(task)
+
+
+    def _list_runs(self, task):
+        exp = task.exp
+        print(f"Listing runs of experiment '{exp.exp.name}' (ID {exp.exp.experiment_id})")
+        num_runs = 0
+        try:
+            with SearchRunsIterator(self.mlflow_client, exp.exp.experiment_id, prefetch=DEFAULT_PREFETCH) as runs:
+                for idx, run in enumerate(runs):
+                    num_runs += 1
+                    yield _Task("run", exp=exp, run=run, idx=idx)
+        except Exception as e:
+            print(f"ERROR: Listing runs of experiment {exp.exp.experiment_id} failed. Exception: {e}")
+            traceback.print_exc()
+            exp.error = str(e)
+        exp.num_runs = num_runs
+        yield task
+
+
+    def _export_metadata(self, task):
+        if task.kind == "model":
+            try:
+                task.ok, _ = self.model_exporter.export_model(task.name, os.path.join(self.models_dir, task.name))
+            except Exception as e:
+                print("ERROR: model:", task.name, "Exception:", e)
+                traceback.print_exc()
+                task.ok = False
+        elif task.kind == "run":
+            print(f"Exporting run {task.idx+1}: {task.run.info.run_id} of experiment {task.exp.exp.experiment_id}")
+            self._call_run_step(task, self.run_exporter.export_run_metadata)
+        return [ task ]
+
+
+    def _export_artifacts(self, task):
+        if task.kind == "run" and task.ok:
+            self._call_run_step(task, self.run_exporter.export_run_artifacts)
+        return [ task ]
+
+
+    def _export_notebook(self, task):
+        if task.kind == "run" and task.ok:
+            self._call_run_step(task, self.run_exporter.export_run_notebook)
+        return [ task ]
+
+
+    def _call_run_step(self, task, func):
+        try:
+            func(task.run, os.path.join(task.exp.output_dir, task.run.info.run_id))
+        except Exception as e:
+            print("ERROR: run_id:", task.run.info.run_id, "Exception:", e)
+            traceback.print_exc()
+            task.ok = False
+
+
+    def _write_manifest(self, task):
+        """
+        Runs in a single worker so experiment state is only updated by one thread.
+        The experiment marker task arrives after the experiment's runs are listed, or failed to be listed,
+        but possibly before some of its run tasks. Every experiment is reported with an 'ok' or 'failed' status.
+        """
+        if task.kind == "model":
+            return [ ("model", (task.ok, task.name)) ]
+        exp = task.exp
+        if task.kind == "run":
+            exp.results[task.idx] = (task.run.info.run_id, task.ok)
+        if exp.done or exp.num_runs is None or len(exp.results) < exp.num_runs:
+            return None
+        exp.done = True
+        results = [ exp.results[idx] for idx in sorted(exp.results) ]
+        ok_run_ids = [ run_id for run_id,ok in results if ok ]
+        failed_run_ids = [ run_id for run_id,ok in results if not ok ]
+        try:
+            write_experiment_export_file(exp.exp, exp.output_dir, ok_run_ids, failed_run_ids)
+        except Exception as e:
+            print(f"ERROR: Writing experiment.json of experiment {exp.exp.experiment_id} failed. Exception: {e}")
+            traceback.print_exc()
+            exp.error = exp.error or str(e)
+        result = {
+            "id" : exp.exp.experiment_id,
+            "name": exp.exp.name,
+            "status": "failed" if exp.error else "ok",
+            "ok_runs": len(ok_run_ids),
+            "failed_runs": len(failed_run_ids),
+            "duration": round(time.time() - exp.start_time, 1)
+        }
+        if exp.error:
+            result["error"] = exp.error
+        print(f"Done exporting experiment {result}")
+        return [ ("experiment", result) ]
+
+
+    # == Export files
+
+    def _write_experiments_file(self, exp_results, duration):
+        ok_runs = sum(res["ok_runs"] for res in exp_results)
+        failed_runs = sum(res["failed_runs"] for res in exp_results)
+        failed_exps = [ res["id"] for res in exp_results if res["status"] == "failed" ]
+        info_attr = {
+          "duration": duration,
+          "experiments": len(exp_results),
+          "failed_experiments": failed_exps,
+          "total_runs": ok_runs + failed_runs,
+          "ok_runs": ok_runs,
+          "failed_runs": failed_runs
+        }
+        mlflow_attr = { "experiments": exp_results }
+        io_utils.write_export_file(self.exps_dir, "experiments.json", __file__, mlflow_attr, info_attr)
+        print(f"{len(exp_results)} experiments exported")
+        if failed_exps:
+            print(f"WARNING: {len(failed_exps)} experiments failed: {failed_exps}")
+        print(f"{ok_runs}/{ok_runs + failed_runs} runs succesfully exported")
+        return info_attr
+
+
+    def _write_models_file(self, ok_models, failed_models, duration):
+        info_attr = {
+            "model_names": sorted(ok_models + failed_models),
+            "stages": self.stages,
+            "export_run": False,
+            "export_latest_versions": False,
+            "notebook_formats": self.notebook_formats,
+            "output_dir": self.models_dir,
+            "num_total_models": len(ok_models) + len(failed_models),
+            "num_ok_models": len(ok_models),
+            "num_failed_models": len(failed_models),
+            "duration": duration,
+            "failed_models": failed_models
+        }
+        mlflow_attr = { "models": ok_models }
+        io_utils.write_export_file(self.models_dir, "models.json", __file__, mlflow_attr, info_attr)
+        print(f"{len(ok_models) + len(failed_models)} models exported")
+        return info_attr
@@ -8,20 +8,28 @@ from concurrent.futures import ThreadPoolExecutor
 import click
 import mlflow
 
-from mlflow_export_import.common.click_options import opt_experiments, opt_output_dir, \
-    opt_notebook_formats, opt_use_threads
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_experiments, opt_output_dir, \
+    opt_notebook_formats, opt_use_threads, opt_run_workers, opt_incremental, opt_resume
 from mlflow_export_import.common import utils, io_utils, mlflow_utils
+from mlflow_export_import.common.timestamp_utils import fmt_ts_millis
 from mlflow_export_import.bulk import bulk_utils
-from mlflow_export_import.experiment.export_experiment import ExperimentExporter
+from mlflow_export_import.client import http_client
+from mlflow_export_import.bulk import export_state
+from mlflow_export_import.bulk.export_journal import ExportJournal
+from mlflow_export_import.experiment.export_experiment import ExperimentExporter, write_experiment_export_file
 
 
-def _export_experiment(client, exp_id_or_name, output_dir, exporter, export_results, run_ids):
+def _export_experiment(client, exp_id_or_name, output_dir, exporter, export_results, run_ids, merge=False):
     exp = mlflow_utils.get_experiment(client, exp_id_or_name)
     exp_output = os.path.join(output_dir, exp.experiment_id)
     ok_runs = -1; failed_runs = -1
     try:
         start_time = time.time()
+        previous_run_ids = export_state.read_previous(exp_output, "experiment.json", "runs") if merge else []
         ok_runs, failed_runs = exporter.export_experiment(exp.experiment_id, exp_output, run_ids)
+        if previous_run_ids:
+            _merge_experiment_export_file(exp, exp_output, previous_run_ids)
         duration = round(time.time() - start_time, 1)
         result = {
             "id" : exp.experiment_id, 
@@ -38,19 +46,55 @@ def _export_experiment(client, exp_id_or_name, output_dir, exporter, export_resu
     return ok_runs, failed_runs
 
 
-def export_experiments(client, experiments, output_dir, notebook_formats=None, use_threads=False):
+def _merge_experiment_export_file(exp, exp_output, previous_run_ids):
+    """
+    Add the runs of the previous export to the experiment.json of an incremental export.
+    """
+    path = os.path.join(exp_output, "experiment.json")
+    dct = io_utils.read_file(path)
+    failed_run_ids = io_utils.get_info(dct)["failed_runs"]
+    ok_run_ids = export_state.merge_ids(previous_run_ids, io_utils.get_mlflow(dct)["runs"], failed_run_ids)
+    write_experiment_export_file(exp, exp_output, ok_run_ids, failed_run_ids)
+
+
+def _get_updated_experiments(client, experiments, since):
+    """
+    :return: Dictionary of experiment ID to run IDs of the experiments updated or with runs started or ended after 'since'.
+    """
+    exps = export_state.resolve_experiments(client, experiments)
+    run_ids = export_state.get_updated_run_ids(client, [ exp.experiment_id for exp in exps ], since)
+    experiments_dct = {}
+    for exp in exps:
+        if exp.experiment_id in run_ids or export_state.is_updated(exp.last_update_time, since):
+            experiments_dct[exp.experiment_id] = run_ids.get(exp.experiment_id, [])
+    print(f"Found {len(experiments_dct)}/{len(experiments)} experiments updated since {fmt_ts_millis(since)}")
+    return experiments_dct
+
+
+def export_experiments(client, experiments, output_dir, notebook_formats=None, use_threads=False, run_workers=1, since=None, resume=False,
+        metadata_cache=None):
     """
     :param: experiments: Can be either:
       - List of experiment names 
       - List of experiment IDs
       - Dictionary whose key is an experiment and the value is a list of run IDs 
       - String with comma-delimited experiment names or IDs such as 'sklearn_wine,sklearn_iris' or '1,2'
+    :param: run_workers: Number of runs of each experiment to export concurrently.
+    :param: since: Incremental export. Timestamp in milliseconds of the previous export into output_dir.
+      Only experiments updated and runs started or ended after it are exported and merged into the previous export.
+      Runs of an experiment dictionary are exported as given and merged.
+    :param: resume: Resume a previous export into output_dir. Runs in its export journal are skipped.
+    :param: metadata_cache: MetadataCache shared with the other exporters of a bulk export.
     """
     start_time = time.time()
     max_workers = os.cpu_count() or 4 if use_threads else 1
+    http_client.set_pool_size(max_workers * run_workers)
 
     export_all_runs = not isinstance(experiments, dict) 
     experiments = bulk_utils.get_experiment_ids(client, experiments)
+    if since is not None and export_all_runs:
+        experiments = _get_updated_experiments(client, experiments, since)
+        export_all_runs = False
     if export_all_runs:
         table_data = experiments
         columns = ["Experiment Name or ID"]
@@ -69,12 +113,17 @@ def export_experiments(client, experiments, output_dir, notebook_formats=None, u
     failed_runs = 0
     export_results = []
     futures = []
-    exporter = ExperimentExporter(client, notebook_formats=utils.string_to_list(notebook_formats))
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for exp_id_or_name in experiments:
-            run_ids = experiments_dct.get(exp_id_or_name, None)
-            future = executor.submit(_export_experiment, client, exp_id_or_name, output_dir, exporter, export_results, run_ids)
-            futures.append(future)
+    with ExportJournal(output_dir, resume) as journal:
+        exporter = ExperimentExporter(client,
+            notebook_formats=utils.string_to_list(notebook_formats),
+            run_workers=run_workers,
+            journal=journal,
+            metadata_cache=metadata_cache)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for exp_id_or_name in experiments:
+                run_ids = experiments_dct.get(exp_id_or_name, None)
+                future = executor.submit(_export_experiment, client, exp_id_or_name, output_dir, exporter, export_results, run_ids, since is not None)
+                futures.append(future)
     duration = round(time.time() - start_time, 1)
     ok_runs = 0
     failed_runs = 0
@@ -93,6 +142,11 @@ def export_experiments(client, experiments, output_dir, notebook_formats=None, u
       "ok_runs": ok_runs,
       "failed_runs": failed_runs
     }
+    if since is not None:
+        info_attr["since"] = since
+        exported_ids = { res["id"] for res in export_results }
+        previous_results = export_state.read_previous(output_dir, "experiments.json", "experiments")
+        export_results = [ res for res in previous_results if res["id"] not in exported_ids ] + export_results
     mlflow_attr = { "experiments": export_results }
     io_utils.write_export_file(output_dir, "experiments.json", __file__, mlflow_attr, info_attr)
 
@@ -110,16 +164,28 @@ def export_experiments(client, experiments, output_dir, notebook_formats=None, u
 @opt_output_dir
 @opt_notebook_formats
 @opt_use_threads
-def main(experiments, output_dir, notebook_formats, use_threads): 
+@opt_run_workers
+@opt_incremental
+@opt_resume
+@opt_max_rates
+def main(experiments, output_dir, notebook_formats, use_threads, run_workers, incremental, resume, max_rates): 
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
+    high_water_mark = export_state.now_millis()
+    since = export_state.read_high_water_mark(output_dir) if incremental else None
     export_experiments(client, 
         experiments=experiments,
         output_dir=output_dir,
         notebook_formats=notebook_formats,
-        use_threads=use_threads)
+        use_threads=use_threads,
+        run_workers=run_workers,
+        since=since,
+        resume=resume)
+    if incremental:
+        export_state.write_high_water_mark(output_dir, high_water_mark)
 
 
 if __name__ == "__main__":
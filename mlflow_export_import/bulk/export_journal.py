@@ -0,0 +1,106 @@
+"""
+Append-only checkpoint journal of a bulk export.
+
+Each successfully exported run or registered model is appended as a JSON line to the journal
+in the output directory as soon as it is exported. A resumed export skips the journaled entries
+and rebuilds experiment.json, experiments.json and models.json from the journal and the newly
+exported entries.
+"""
+
+import os
+import json
+import threading
+
+from mlflow_export_import.common import filesystem as _filesystem
+
+JOURNAL_FILE = "export_journal.jsonl"
+
+
+class ExportJournal():
+
+    def __init__(self, output_dir, resume=False):
+        """
+        :param output_dir: Output directory of the export.
+        :param resume: Load the entries of the existing journal. If False the journal is truncated.
+        """
+        output_dir = _filesystem.mk_local_path(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = os.path.join(output_dir, JOURNAL_FILE)
+        self.run_ids = {} # experiment ID to run IDs
+        self.model_names = []
+        self._done_run_ids = set()
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        else:
+            open(self.path, "w", encoding="utf-8").close()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        end = 0 # offset after the last complete line
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"): # partially written last line of a crashed export
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    break
+                self._add(entry)
+                end += len(line)
+        if end < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+        print(f"Resuming export with {len(self._done_run_ids)} runs and {len(self.model_names)} models from '{self.path}'")
+
+
+    def _add(self, entry):
+        if entry["type"] == "run":
+            self.run_ids.setdefault(entry["experiment_id"], []).append(entry["run_id"])
+            self._done_run_ids.add(entry["run_id"])
+        elif entry["type"] == "model":
+            self.model_names.append(entry["name"])
+
+
+    def _append(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry)+"\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._add(entry)
+
+
+    def is_run_done(self, run_id):
+        return run_id in self._done_run_ids
+
+
+    def is_model_done(self, model_name):
+        return model_name in self.model_names
+
+
+    def get_run_ids(self, experiment_id):
+        """ :return: IDs of the journaled runs of an experiment in export order. """
+        return list(self.run_ids.get(experiment_id, []))
+
+
+    def add_run(self, experiment_id, run_id):
+        self._append({ "type": "run", "experiment_id": experiment_id, "run_id": run_id })
+
+
+    def add_model(self, model_name):
+        self._append({ "type": "model", "name": model_name })
+
+
+    def close(self):
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
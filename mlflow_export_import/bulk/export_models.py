@@ -9,13 +9,56 @@ from concurrent.futures import ThreadPoolExecutor
 
 import mlflow
 
-from mlflow_export_import.common.click_options import opt_output_dir, opt_notebook_formats, \
-    opt_stages, opt_use_threads, opt_export_latest_versions
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_output_dir, opt_notebook_formats, \
+    opt_stages, opt_use_threads, opt_export_latest_versions, opt_resume
 from mlflow_export_import.common import utils, io_utils
+from mlflow_export_import.client import http_client
 from mlflow_export_import.model.export_model import ModelExporter
 from mlflow_export_import.bulk import export_experiments
+from mlflow_export_import.bulk import model_utils
 from mlflow_export_import.bulk.model_utils import get_experiments_runs_of_models
 from mlflow_export_import.bulk import bulk_utils
+from mlflow_export_import.bulk import export_state
+from mlflow_export_import.bulk.export_journal import ExportJournal
+from mlflow_export_import.common.timestamp_utils import fmt_ts_millis
+from mlflow_export_import.common.metadata_cache import MetadataCache
+from mlflow_export_import.common.iterators import SearchRegisteredModelsIterator, DEFAULT_PREFETCH
+from mlflow_export_import.common.thread_utils import map_unordered
+
+
+def _get_updated_model_names(client, model_names, since, is_all=False):
+    """
+    :return: Names of the models updated or with versions updated after 'since'.
+    """
+    updated = { vr.name for vr in model_utils.search_model_versions(client, model_names, is_all)
+        if export_state.is_updated(vr.last_updated_timestamp, since) }
+    others = [ model_name for model_name in model_names if model_name not in updated ]
+    if is_all or len(others) >= model_utils.GLOBAL_SCAN_MIN_MODELS:
+        others = set(others)
+        with SearchRegisteredModelsIterator(client, prefetch=DEFAULT_PREFETCH) as models:
+            updated.update(model.name for model in models
+                if model.name in others and export_state.is_updated(model.last_updated_timestamp, since))
+    else:
+        def is_model_updated(model_name):
+            return model_name, export_state.is_updated(client.get_registered_model(model_name).last_updated_timestamp, since)
+        updated.update(model_name for model_name, ok in map_unordered(is_model_updated, others, model_utils.RUN_LOOKUP_WORKERS) if ok)
+    updated_names = [ model_name for model_name in model_names if model_name in updated ]
+    print(f"Found {len(updated_names)}/{len(model_names)} models updated since {fmt_ts_millis(since)}")
+    return updated_names
+
+
+def _merge_model_export_file(model_output, previous_versions):
+    """
+    Add the versions of the previous export that were not exported again to the model.json of an incremental export.
+    """
+    path = os.path.join(model_output, "model.json")
+    dct = io_utils.read_file(path)
+    model = io_utils.get_mlflow(dct)["registered_model"]
+    exported = { vr["version"] for vr in model["versions"] + io_utils.get_info(dct)["failed_versions"] }
+    model["versions"] = [ vr for vr in previous_versions if vr["version"] not in exported ] + model["versions"]
+    model["versions"].sort(key=lambda vr: int(vr["version"]))
+    io_utils.write_file(path, dct)
 
 
 def _export_models(client, 
@@ -25,11 +68,21 @@ def _export_models(client,
         stages, 
         export_run=True, 
         use_threads=False, 
-        export_latest_versions=False
+        export_latest_versions=False,
+        since=None,
+        resume=False,
+        metadata_cache=None
     ):
     max_workers = os.cpu_count() or 4 if use_threads else 1
+    http_client.set_pool_size(max_workers)
     start_time = time.time()
+    is_all = model_names == "all"
     model_names = bulk_utils.get_model_names(client, model_names)
+    if since is not None:
+        model_names = _get_updated_model_names(client, model_names, since, is_all)
+    journal = ExportJournal(output_dir, resume)
+    done_models = [ model_name for model_name in model_names if journal.is_model_done(model_name) ]
+    model_names = [ model_name for model_name in model_names if not journal.is_model_done(model_name) ]
     print("Models to export:")
     for model_name in model_names:
         print(f"  {model_name}")
@@ -38,19 +91,31 @@ def _export_models(client,
         notebook_formats=utils.string_to_list(notebook_formats), 
         stages=stages, 
         export_run=export_run,
-        export_latest_versions=export_latest_versions
+        export_latest_versions=export_latest_versions,
+        metadata_cache=metadata_cache,
+        since=since
     )
+    def export_model(model_name):
+        model_output = os.path.join(output_dir, model_name)
+        previous_model = export_state.read_previous(model_output, "model.json", "registered_model") if since is not None else None
+        ok, model_name = exporter.export_model(model_name, model_output)
+        if ok and previous_model:
+            _merge_model_export_file(model_output, previous_model["versions"])
+        if ok:
+            journal.add_model(model_name)
+        return ok, model_name
+
     futures = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with journal, ThreadPoolExecutor(max_workers=max_workers) as executor:
         for model_name in model_names:
-            dir = os.path.join(output_dir, model_name)
-            future = executor.submit(exporter.export_model, model_name, dir)
+            future = executor.submit(export_model, model_name)
             futures.append(future)
-    ok_models = [] ; failed_models = []
+    ok_models = list(done_models) ; failed_models = []
     for future in futures:
         result = future.result()
         if result[0]: ok_models.append(result[1])
         else: failed_models.append(result[1])
+    model_names = done_models + model_names
     duration = round(time.time()-start_time, 1)
 
     info_attr = {
@@ -67,6 +132,10 @@ def _export_models(client,
         "duration": duration,
         "failed_models": failed_models
     }
+    if since is not None:
+        info_attr["since"] = since
+        previous_models = export_state.read_previous(output_dir, "models.json", "models")
+        ok_models = export_state.merge_ids(previous_models, ok_models, failed_models)
     mlflow_attr = {
         "models": ok_models,
     }
@@ -85,16 +154,29 @@ def export_models(client,
         stages="", 
         export_all_runs=False, 
         use_threads=False, 
-        export_latest_versions=False
+        export_latest_versions=False,
+        since=None,
+        resume=False,
+        metadata_cache=None
     ):
-    exps_and_runs = get_experiments_runs_of_models(client, model_names)
+    """
+    :param since: Incremental export. Timestamp in milliseconds of the previous export into output_dir.
+      Only models and versions updated after it and their runs are exported and merged into the previous export.
+    :param resume: Resume a previous export into output_dir. Runs and models in its export journals are skipped.
+    :param metadata_cache: MetadataCache shared with other exporters. Default is a cache of this export.
+    """
+    metadata_cache = metadata_cache or MetadataCache(client)
+    exps_and_runs = get_experiments_runs_of_models(client, model_names, since=since)
     exp_ids = exps_and_runs.keys()
     start_time = time.time()
     out_dir = os.path.join(output_dir, "experiments")
     exps_to_export = exp_ids if export_all_runs else exps_and_runs
-    res_exps = export_experiments.export_experiments(client, exps_to_export, out_dir, notebook_formats, use_threads)
+    res_exps = export_experiments.export_experiments(client, exps_to_export, out_dir, notebook_formats, use_threads,
+        since=since, resume=resume, metadata_cache=metadata_cache)
     res_models =_export_models(client, model_names, os.path.join(output_dir,"models"), notebook_formats, stages,
-        export_run=False, use_threads=use_threads, export_latest_versions=export_latest_versions)
+        export_run=False, use_threads=use_threads, export_latest_versions=export_latest_versions, since=since, resume=resume,
+        metadata_cache=metadata_cache)
+    metadata_cache.report()
     duration = round(time.time()-start_time, 1)
     print(f"Duration for total registered models and versions' runs export: {duration} seconds")
 
@@ -106,6 +188,8 @@ def export_models(client,
         "notebook_formats": notebook_formats,
         "use_threads": use_threads,
         "output_dir": output_dir,
+        "since": since,
+        "resume": resume,
         "models": res_models,
         "experiments": res_exps
     }
@@ -118,7 +202,8 @@ def export_models(client,
 @opt_output_dir
 @click.option("--models", 
     help="Registered model names (comma delimited).  \
-        For example, 'model1,model2'. 'all' will export all models.",
+        For example, 'model1,model2'. 'all' will export all models. \
+        Names can be glob patterns such as 'sklearn*'.",
     type=str,
     required=True
 )
@@ -132,10 +217,13 @@ def export_models(client,
 )
 @opt_notebook_formats
 @opt_use_threads
-def main(models, output_dir, stages, notebook_formats, export_all_runs, use_threads, export_latest_versions):
+@opt_resume
+@opt_max_rates
+def main(models, output_dir, stages, notebook_formats, export_all_runs, use_threads, export_latest_versions, resume, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     export_models(client,
         models, 
@@ -144,7 +232,8 @@ def main(models, output_dir, stages, notebook_formats, export_all_runs, use_thre
         stages=stages, 
         export_all_runs=export_all_runs, 
         export_latest_versions=export_latest_versions, 
-        use_threads=use_threads)
+        use_threads=use_threads,
+        resume=resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""
+High-water-mark state of incremental bulk exports.
+
+The state file is written next to the export's manifest file and records when the export started.
+The next incremental export into the same directory only exports objects created or updated after
+that time, and merges them into the previous export.
+"""
+
+import os
+import time
+from mlflow.entities import ViewType
+
+from mlflow_export_import.common import io_utils, mlflow_utils
+from mlflow_export_import.common.iterators import SearchExperimentsIterator, SearchRunsIterator, DEFAULT_PREFETCH
+from mlflow_export_import.common.thread_utils import map_unordered
+from mlflow_export_import.common.timestamp_utils import fmt_ts_millis
+
+STATE_FILE = "export_state.json"
+MAX_SEARCH_EXPERIMENTS = 100 # experiments whose runs are searched with one search
+LISTING_MIN_EXPERIMENTS = 20 # selections of at least this many experiments are resolved by listing all experiments
+LOOKUP_WORKERS = 8
+
+
+def now_millis():
+    return round(time.time() * 1000)
+
+
+def read_high_water_mark(output_dir):
+    """
+    :return: Start time in milliseconds of the previous export into output_dir or None if there is none.
+    """
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    return io_utils.read_file_mlflow(path)["high_water_mark"]
+
+
+def write_high_water_mark(output_dir, high_water_mark):
+    mlflow_attr = { "high_water_mark": high_water_mark }
+    info_attr = { "_high_water_mark": fmt_ts_millis(high_water_mark) }
+    io_utils.write_export_file(output_dir, STATE_FILE, __file__, mlflow_attr, info_attr)
+
+
+def is_updated(timestamp, since):
+    return since is None or (timestamp is not None and timestamp > since)
+
+
+def mk_updated_runs_filters(since):
+    """
+    Search filters for runs started or ended after a timestamp.
+    Search filters cannot 'OR' so each condition has its own filter.
+    """
+    return [ f"attributes.start_time > {since}", f"attributes.end_time > {since}" ]
+
+
+def get_updated_run_ids(client, experiment_ids, since):
+    """
+    The runs of up to MAX_SEARCH_EXPERIMENTS experiments are searched at once.
+    :return: Dictionary of experiment ID to IDs of its runs started or ended after 'since'.
+    """
+    experiment_ids = list(experiment_ids)
+    run_ids = {}
+    for j in range(0, len(experiment_ids), MAX_SEARCH_EXPERIMENTS):
+        batch = experiment_ids[j:j+MAX_SEARCH_EXPERIMENTS]
+        for filter in mk_updated_runs_filters(since):
+            with SearchRunsIterator(client, batch, filter=filter, prefetch=DEFAULT_PREFETCH) as runs:
+                for run in runs:
+                    run_ids.setdefault(run.info.experiment_id, {})[run.info.run_id] = True
+    return { exp_id: list(ids.keys()) for exp_id, ids in run_ids.items() }
+
+
+def resolve_experiments(client, experiments):
+    """
+    Get the experiments of a selection. Selections of at least LISTING_MIN_EXPERIMENTS are resolved
+    by listing all experiments, smaller ones by looking up each experiment concurrently.
+    :param experiments: List of experiment IDs or names.
+    :return: List of experiments.
+    """
+    def lookup(exp_id_or_name):
+        return mlflow_utils.get_experiment(client, exp_id_or_name)
+    if len(experiments) < LISTING_MIN_EXPERIMENTS:
+        exps = dict(map_unordered(lambda x: (x, lookup(x)), experiments, LOOKUP_WORKERS))
+        return [ exps[x] for x in experiments ]
+    by_name, by_id = {}, {}
+    with SearchExperimentsIterator(client, view_type=ViewType.ALL, prefetch=DEFAULT_PREFETCH) as exps:
+        for exp in exps:
+            by_name[exp.name] = exp
+            by_id[exp.experiment_id] = exp
+    return [ by_name.get(x) or by_id.get(x) or lookup(x) for x in experiments ]
+
+
+def read_previous(output_dir, file, key):
+    """
+    :return: Value of key in the 'mlflow' section of a previously exported file or an empty list.
+    """
+    path = os.path.join(output_dir, file)
+    if not os.path.exists(path):
+        return []
+    return io_utils.read_file_mlflow(path).get(key, [])
+
+
+def merge_ids(previous_ids, ok_ids, failed_ids):
+    """
+    Merge IDs of a previous export with the IDs successfully exported now. IDs that now failed are dropped.
+    """
+    failed_ids = set(failed_ids)
+    merged = { id: True for id in previous_ids if id not in failed_ids }
+    merged.update({ id: True for id in ok_ids })
+    return list(merged.keys())
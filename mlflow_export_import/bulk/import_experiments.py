@@ -8,9 +8,12 @@ from concurrent.futures import ThreadPoolExecutor
 
 import mlflow
 
+from mlflow_export_import.common import rate_limiter
 from mlflow_export_import.common.click_options import *
 from mlflow_export_import.common import io_utils
+from mlflow_export_import.client import http_client
 from mlflow_export_import.experiment.import_experiment import ExperimentImporter
+from mlflow_export_import.bulk.import_id_map import ImportIdMap
 
 
 def _import_experiment(importer, exp_name, exp_input_dir):
@@ -21,31 +24,41 @@ def _import_experiment(importer, exp_name, exp_input_dir):
         traceback.print_exc()
 
 
-def import_experiments(client, input_dir, use_src_user_id=False, use_threads=False): 
+def import_experiments(client, input_dir, use_src_user_id=False, use_threads=False, run_workers=1, resume=False): 
+    """
+    :param resume: Resume a previous import of input_dir. Entities in its ID map are skipped.
+    """
     dct = io_utils.read_file_mlflow(os.path.join(input_dir, "experiments.json"))
     exps = dct["experiments"]
     for exp in exps:
         print("  ",exp)
 
-    importer = ExperimentImporter(client, use_src_user_id=use_src_user_id)
+    id_map = ImportIdMap(input_dir, resume)
+    importer = ExperimentImporter(client, use_src_user_id=use_src_user_id, run_workers=run_workers, id_map=id_map)
     max_workers = os.cpu_count() or 4 if use_threads else 1
+    http_client.set_pool_size(max_workers * run_workers)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         for exp in exps:
             exp_input_dir = os.path.join(input_dir,exp["id"])
             exp_name = exp["name"]
             executor.submit(_import_experiment, importer, exp_name, exp_input_dir)
+    id_map.close()
 
 
 @click.command()
 @opt_input_dir
 @opt_use_src_user_id
 @opt_use_threads
-def main(input_dir, use_src_user_id, use_threads): 
+@opt_import_run_workers
+@opt_import_resume
+@opt_max_rates
+def main(input_dir, use_src_user_id, use_threads, run_workers, resume, max_rates): 
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
-    import_experiments(client, input_dir, use_src_user_id, use_threads)
+    import_experiments(client, input_dir, use_src_user_id, use_threads, run_workers, resume)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,140 @@
+"""
+Persistent map of source to destination IDs of a bulk import.
+
+Each imported experiment, run and registered model version is committed to a SQLite database
+as soon as it is imported. A resumed import skips the entities already in the map.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from mlflow_export_import.common import filesystem as _filesystem
+
+ID_MAP_FILE = "import_id_map.db"
+
+# Destination run info of a run imported by a previous import. Has the RunInfo fields used by AllModelImporter.
+MappedRunInfo = namedtuple("MappedRunInfo", ["run_id", "artifact_uri"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    src_experiment_id TEXT PRIMARY KEY,
+    dst_experiment_id TEXT,
+    completed INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS runs (
+    src_run_id TEXT PRIMARY KEY,
+    src_experiment_id TEXT,
+    dst_run_id TEXT,
+    dst_artifact_uri TEXT,
+    src_parent_run_id TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_src_experiment_id ON runs(src_experiment_id);
+CREATE TABLE IF NOT EXISTS model_versions (
+    model_name TEXT,
+    src_version TEXT,
+    dst_version TEXT,
+    PRIMARY KEY (model_name, src_version)
+);
+"""
+
+
+class ImportIdMap():
+
+    def __init__(self, dir, resume=False):
+        """
+        :param dir: Directory of the map database - usually the import input directory.
+        :param resume: Keep the entries of an existing map. If False the map is cleared.
+        """
+        dir = _filesystem.mk_local_path(dir)
+        os.makedirs(dir, exist_ok=True)
+        self.path = os.path.join(dir, ID_MAP_FILE)
+        self.resume = resume
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            if not resume:
+                for table in [ "experiments", "runs", "model_versions" ]:
+                    self._conn.execute(f"DELETE FROM {table}")
+        if resume:
+            num_runs = self._query_one("SELECT COUNT(*) FROM runs")[0]
+            print(f"Resuming import with {num_runs} runs already imported from '{self.path}'")
+
+
+    def _execute(self, sql, params):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+
+    def _query_one(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+
+    def _query_all(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+    # == Experiments
+
+    def add_experiment(self, src_experiment_id, dst_experiment_id):
+        self._execute("INSERT OR IGNORE INTO experiments (src_experiment_id, dst_experiment_id) VALUES (?,?)",
+            (src_experiment_id, dst_experiment_id))
+
+
+    def complete_experiment(self, src_experiment_id):
+        self._execute("UPDATE experiments SET completed = 1 WHERE src_experiment_id = ?", (src_experiment_id,))
+
+
+    def is_experiment_completed(self, src_experiment_id):
+        row = self._query_one("SELECT completed FROM experiments WHERE src_experiment_id = ?", (src_experiment_id,))
+        return row is not None and row[0] == 1
+
+
+    # == Runs
+
+    def add_run(self, src_run_id, src_experiment_id, dst_run_info, src_parent_run_id=None):
+        self._execute("INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?)",
+            (src_run_id, src_experiment_id, dst_run_info.run_id, dst_run_info.artifact_uri, src_parent_run_id))
+
+
+    def get_runs(self, src_experiment_id):
+        """
+        :return: Dictionary of source run ID to destination MappedRunInfo and source parent run ID.
+        """
+        rows = self._query_all("SELECT src_run_id, dst_run_id, dst_artifact_uri, src_parent_run_id FROM runs WHERE src_experiment_id = ?",
+            (src_experiment_id,))
+        return { row[0]: (MappedRunInfo(row[1], row[2]), row[3]) for row in rows }
+
+
+    # == Model versions
+
+    def add_model_version(self, model_name, src_version, dst_version):
+        self._execute("INSERT OR REPLACE INTO model_versions VALUES (?,?,?)", (model_name, str(src_version), str(dst_version)))
+
+
+    def get_model_version(self, model_name, src_version):
+        """
+        :return: Destination version of a source model version or None if it was not imported.
+        """
+        row = self._query_one("SELECT dst_version FROM model_versions WHERE model_name = ? AND src_version = ?",
+            (model_name, str(src_version)))
+        return row[0] if row else None
+
+
+    def get_dst_model_versions(self, model_name):
+        """
+        :return: Set of the destination versions of a model in the map.
+        """
+        return { row[0] for row in self._query_all("SELECT dst_version FROM model_versions WHERE model_name = ?", (model_name,)) }
+
+
+    def has_model_versions(self, model_name):
+        return self._query_one("SELECT 1 FROM model_versions WHERE model_name = ? LIMIT 1", (model_name,)) is not None
+
+
+    def close(self):
+        self._conn.close()
@@ -9,11 +9,14 @@ import click
 from concurrent.futures import ThreadPoolExecutor
 
 import mlflow
-from mlflow_export_import.common.click_options import opt_input_dir, opt_delete_model, opt_use_src_user_id, \
-    opt_verbose, opt_import_source_tags, opt_use_threads
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_input_dir, opt_delete_model, opt_use_src_user_id, \
+    opt_verbose, opt_import_source_tags, opt_use_threads, opt_import_run_workers, opt_import_resume
 from mlflow_export_import.common import io_utils
+from mlflow_export_import.client import http_client
 from mlflow_export_import.experiment.import_experiment import ExperimentImporter
 from mlflow_export_import.model.import_model import AllModelImporter
+from mlflow_export_import.bulk.import_id_map import ImportIdMap
 
 
 def _remap(run_info_map):
@@ -24,13 +27,13 @@ def _remap(run_info_map):
     return res
 
 
-def _import_experiments(client, input_dir, use_src_user_id):
+def _import_experiments(client, input_dir, use_src_user_id, run_workers=1, id_map=None):
     start_time = time.time()
 
     dct = io_utils.read_file_mlflow(os.path.join(os.path.join(input_dir,"experiments","experiments.json")))
     exps = dct["experiments"]
 
-    importer = ExperimentImporter(client, use_src_user_id=use_src_user_id)
+    importer = ExperimentImporter(client, use_src_user_id=use_src_user_id, run_workers=run_workers, id_map=id_map)
     print("Experiments:")
     for exp in exps: 
         print(" ",exp)
@@ -55,14 +58,15 @@ def _import_experiments(client, input_dir, use_src_user_id):
     return run_info_map, { "experiments": len(exps), "exceptions": exceptions, "duration": duration }
 
 
-def _import_models(client, input_dir, run_info_map, delete_model, import_source_tags, verbose, use_threads):
+def _import_models(client, input_dir, run_info_map, delete_model, import_source_tags, verbose, use_threads, id_map=None):
     max_workers = os.cpu_count() or 4 if use_threads else 1
+    http_client.set_pool_size(max_workers)
     start_time = time.time()
 
     models_dir = os.path.join(input_dir, "models")
     models = io_utils.read_file_mlflow(os.path.join(os.path.join(models_dir,"models.json")))
     models = models["models"]
-    importer = AllModelImporter(client, run_info_map=run_info_map, import_source_tags=import_source_tags)
+    importer = AllModelImporter(client, run_info_map=run_info_map, import_source_tags=import_source_tags, id_map=id_map)
 
     if use_threads:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -84,12 +88,19 @@ def import_all(client,
         use_src_user_id=False, 
         import_source_tags=False, 
         verbose=False, 
-        use_threads=False
+        use_threads=False,
+        run_workers=1,
+        resume=False
     ):
+    """
+    :param resume: Resume a previous import of input_dir. Experiments, runs and model versions in its ID map are skipped.
+    """
     start_time = time.time()
-    exp_res = _import_experiments(client, input_dir, use_src_user_id)
+    id_map = ImportIdMap(input_dir, resume)
+    exp_res = _import_experiments(client, input_dir, use_src_user_id, run_workers, id_map)
     run_info_map = _remap(exp_res[0])
-    model_res = _import_models(client, input_dir, run_info_map, delete_model, import_source_tags, verbose, use_threads)
+    model_res = _import_models(client, input_dir, run_info_map, delete_model, import_source_tags, verbose, use_threads, id_map)
+    id_map.close()
     duration = round(time.time()-start_time, 1)
     dct = { "duration": duration, "experiment_import": exp_res[1], "model_import": model_res }
     print("\nImport report:")
@@ -103,10 +114,14 @@ def import_all(client,
 @opt_verbose
 @opt_import_source_tags
 @opt_use_threads
-def main(input_dir, delete_model, use_src_user_id, import_source_tags, verbose, use_threads):
+@opt_import_run_workers
+@opt_import_resume
+@opt_max_rates
+def main(input_dir, delete_model, use_src_user_id, import_source_tags, verbose, use_threads, run_workers, resume, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     import_all(
         client,
@@ -115,7 +130,9 @@ def main(input_dir, delete_model, use_src_user_id, import_source_tags, verbose,
         use_src_user_id=use_src_user_id, 
         import_source_tags=import_source_tags,
         verbose=verbose, 
-        use_threads=use_threads)
+        use_threads=use_threads,
+        run_workers=run_workers,
+        resume=resume)
 
 
 if __name__ == "__main__":
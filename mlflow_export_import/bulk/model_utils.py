@@ -1,31 +1,74 @@
 import mlflow
 
 from mlflow_export_import.bulk import bulk_utils
+from mlflow_export_import.common.iterators import SearchModelVersionsIterator, DEFAULT_PREFETCH
+from mlflow_export_import.common.thread_utils import map_unordered
 
+RUN_LOOKUP_WORKERS = 8
+GLOBAL_SCAN_MIN_MODELS = 20 # selections of at least this many models search all versions at once
 
-def get_experiments_runs_of_models(client, model_names, show_experiments=False, show_runs=False):
-    """ Get experiments and runs to to export. """
+
+def get_experiments_runs_of_models(client, model_names, show_experiments=False, show_runs=False, since=None,
+        max_workers=RUN_LOOKUP_WORKERS):
+    """
+    Get experiments and runs to to export.
+    The versions of a few models are searched per model concurrently. For 'all' or at least
+    GLOBAL_SCAN_MIN_MODELS models the versions of all models are fetched with one paginated search instead.
+    The experiments of their distinct runs are then looked up concurrently.
+    :param since: Only return the runs of versions updated after this timestamp in milliseconds.
+    :param max_workers: Number of models searched or runs looked up concurrently.
+    """
+    is_all = model_names == "all"
     model_names = bulk_utils.get_model_names(client, model_names)
     print(f"{len(model_names)} Models:")
     for model_name in model_names:
         print(f"  {model_name}")
+    versions = {}
+    for vr in search_model_versions(client, model_names, is_all, max_workers):
+        if since is not None and vr.last_updated_timestamp <= since:
+            continue
+        versions.setdefault(vr.run_id, vr)
+
+    def get_experiment_id(run_id):
+        vr = versions[run_id]
+        try:
+            return run_id, client.get_run(run_id).info.experiment_id
+        except mlflow.exceptions.MlflowException as e:
+            if e.error_code == "RESOURCE_DOES_NOT_EXIST":
+                print(f"WARNING: run '{run_id}' of version {vr.version} of model '{vr.name}' does not exist")
+            else:
+                print(f"WARNING: run '{run_id}' of version {vr.version} of model '{vr.name}': Error.code: {e.error_code}. Error.message: {e.message}")
+            return run_id, None
+
+    exp_ids = dict(map_unordered(get_experiment_id, list(versions.keys()), max_workers))
     exps_and_runs = {}
-    for model_name in model_names:
-        versions = client.search_model_versions(f"name='{model_name}'")
-        for vr in versions:
-            try:
-                run = client.get_run(vr.run_id)
-                exps_and_runs.setdefault(run.info.experiment_id,[]).append(run.info.run_id)
-            except mlflow.exceptions.MlflowException as e:
-                if e.error_code == "RESOURCE_DOES_NOT_EXIST":
-                    print(f"WARNING: run '{vr.run_id}' of version {vr.version} of model '{model_name}' does not exist")
-                else:
-                    print(f"WARNING: run '{vr.run_id}' of version {vr.version} of model '{model_name}': Error.code: {e.error_code}. Error.message: {e.message}")
+    for run_id in versions:
+        exp_id = exp_ids[run_id]
+        if exp_id is not None:
+            exps_and_runs.setdefault(exp_id,[]).append(run_id)
     if show_experiments:
         show_experiments_runs_of_models(exps_and_runs, show_runs)
     return exps_and_runs
 
 
+def search_model_versions(client, model_names, is_all=False, max_workers=RUN_LOOKUP_WORKERS):
+    """
+    Search the versions of models per model concurrently or, for 'all' or at least GLOBAL_SCAN_MIN_MODELS models,
+    with one search of the versions of all models.
+    :param model_names: List of model names.
+    :param is_all: The models are all registered models.
+    :return: Versions of the models in the order of model_names when searched per model.
+    """
+    if is_all or len(model_names) >= GLOBAL_SCAN_MIN_MODELS or any("'" in name for name in model_names):
+        model_names_set = set(model_names)
+        with SearchModelVersionsIterator(client, prefetch=DEFAULT_PREFETCH) as versions:
+            return [ vr for vr in versions if vr.name in model_names_set ]
+    def search(model_name):
+        return model_name, list(SearchModelVersionsIterator(client, filter=f"name='{model_name}'"))
+    versions = dict(map_unordered(search, model_names, max_workers))
+    return [ vr for model_name in model_names for vr in versions[model_name] ]
+
+
 def show_experiments_runs_of_models(exps_and_runs, show_runs=False):
     print("Experiments for models:")
     for k,v in exps_and_runs.items():
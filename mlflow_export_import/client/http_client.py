@@ -1,12 +1,73 @@
 import os
 import json
+import time
+import threading
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 import click
 from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common.retry_utils import backoff_seconds
+from mlflow_export_import.common import rate_limiter
 from mlflow_export_import.client import USER_AGENT
 from mlflow_export_import.client import mlflow_auth_utils
 
-_TIMEOUT = 15
+_CONNECT_TIMEOUT = 10 # seconds
+_READ_TIMEOUT = 60 # seconds
+_MAX_RETRIES = 5
+_RETRY_STATUS_CODES = { 429, 500, 502, 503, 504 }
+_DEFAULT_POOL_SIZE = 10
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def set_pool_size(num_workers):
+    """
+    Size the connection pool of the shared session for the number of threads making requests,
+    i.e. the product of the worker counts of the nested thread pools.
+    The pool only grows so that concurrent exports or imports do not shrink each other's pool.
+    A larger pool is a new session that replaces the current one, whose connections are then closed.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is not None and num_workers <= _session_pool_size:
+            return
+        pool_size = max(_DEFAULT_POOL_SIZE, num_workers)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        old_session = _session
+        _session, _session_pool_size = session, pool_size
+    if old_session is not None:
+        old_session.close()
+
+
+def get_session():
+    """
+    :return: Process-wide keep-alive session shared by all HTTP clients.
+    """
+    if _session is None:
+        set_pool_size(_DEFAULT_POOL_SIZE)
+    return _session
+
+
+def _get_retry_after(rsp):
+    """ :return: Seconds of the 'Retry-After' header - delay seconds or HTTP date - or None. """
+    value = rsp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 
 class HttpClient():
     """ Wrapper for GET and POST methods for Databricks REST APIs  - standard Databricks API and MLflow API. """
@@ -32,7 +93,7 @@ class HttpClient():
         :param params: Dict of query parameters 
         """
         uri = self._mk_uri(resource)
-        rsp = requests.get(uri, headers=self._mk_headers(), json=params, timeout=_TIMEOUT)
+        rsp = self._request("GET", uri, resource, json=params)
         self._check_response(rsp, uri, params)
         return rsp
 
@@ -46,7 +107,7 @@ class HttpClient():
         """
         uri = self._mk_uri(resource)
         data = json.dumps(data) if data else None
-        rsp = requests.post(uri, headers=self._mk_headers(), data=data, timeout=_TIMEOUT)
+        rsp = self._request("POST", uri, resource, data=data)
         self._check_response(rsp, uri, data)
         return rsp
 
@@ -61,7 +122,7 @@ class HttpClient():
         """
         uri = self._mk_uri(resource)
         data = json.dumps(data) if data else None
-        rsp = requests.delete(uri, headers=self._mk_headers(), data=data, timeout=_TIMEOUT)
+        rsp = self._request("DELETE", uri, resource, data=data)
         self._check_response(rsp, uri, data)
         return rsp
 
@@ -69,6 +130,38 @@ class HttpClient():
         return json.loads(self._delete(resource, data).text)
 
 
+    def _request(self, method, uri, resource, **kwargs):
+        """
+        Execute a request with the shared session once the rate limiter of the resource allows it.
+        Retries connection errors and 429/5xx responses with exponential backoff and jitter, honoring 'Retry-After'.
+        The Databricks and MLflow endpoints called by this package are idempotent so POST and DELETE are retried too.
+        """
+        limiter = rate_limiter.get_limiter(rate_limiter.get_resource_endpoint_class(resource))
+        for attempt in range(_MAX_RETRIES+1):
+            limiter.acquire()
+            try:
+                rsp = get_session().request(method, uri, headers=self._mk_headers(),
+                    timeout=(_CONNECT_TIMEOUT, _READ_TIMEOUT), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == _MAX_RETRIES:
+                    raise
+                seconds = backoff_seconds(attempt)
+                print(f"WARNING: {method} {uri} failed: {e}. Retrying in {round(seconds,1)} seconds. Attempt {attempt+1}/{_MAX_RETRIES}.")
+                time.sleep(seconds)
+                continue
+            if rsp.status_code in (429, 503):
+                limiter.on_throttled()
+            else:
+                limiter.on_success()
+            if rsp.status_code not in _RETRY_STATUS_CODES or attempt == _MAX_RETRIES:
+                return rsp
+            seconds = _get_retry_after(rsp)
+            if seconds is None:
+                seconds = backoff_seconds(attempt)
+            print(f"WARNING: {method} {uri} returned HTTP {rsp.status_code}. Retrying in {round(seconds,1)} seconds. Attempt {attempt+1}/{_MAX_RETRIES}.")
+            time.sleep(seconds)
+
+
     def _mk_headers(self):
         headers = { "User-Agent": USER_AGENT }
         if self.token:
@@ -100,6 +193,34 @@ class MlflowHttpClient(HttpClient):
         super().__init__("api/2.0/mlflow", host, token)
 
 
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _get_client(client_class):
+    import mlflow
+    key = (client_class, mlflow.get_tracking_uri())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = client_class()
+            _clients[key] = client
+    return client
+
+
+def get_databricks_http_client():
+    """
+    :return: Shared DatabricksHttpClient of the current tracking URI. Credentials are only resolved once.
+    """
+    return _get_client(DatabricksHttpClient)
+
+
+def get_mlflow_http_client():
+    """
+    :return: Shared MlflowHttpClient of the current tracking URI. Credentials are only resolved once.
+    """
+    return _get_client(MlflowHttpClient)
+
+
 @click.command()
 @click.option("--api", help="API: mlflow|databricks.", default="mlflow", type=str)
 @click.option("--resource", help="API resource such as 'experiments/search'.", required=True, type=str)
@@ -0,0 +1,174 @@
+"""
+Parallel per-file transfer of run artifacts.
+"""
+
+import os
+import time
+import shutil
+import uuid
+import requests
+from mlflow.store.artifact.artifact_repository_registry import get_artifact_repository
+
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.thread_utils import map_unordered
+from mlflow_export_import.common.artifact_walker import ArtifactWalker
+
+_TMP_DIR_PREFIX = ".tmp-download-"
+
+MULTIPART_THRESHOLD = 100 * 1024 * 1024 # files larger than this are uploaded in parts if the artifact repository supports it
+PART_SIZE = 16 * 1024 * 1024
+
+
+def list_artifact_files(mlflow_client, run_id, path=""):
+    """
+    :return: List of the FileInfo of all files under path.
+    """
+    return list(ArtifactWalker(mlflow_client).list_files(run_id, path))
+
+
+def _is_downloaded(local_path, file_size):
+    return file_size is not None and os.path.isfile(local_path) and os.path.getsize(local_path) == file_size
+
+
+def _get_tmp_area(dst_path):
+    """
+    :return: Temporary download directory next to dst_path, so that it is on the same file system
+             but never part of the artifacts.
+    """
+    dst_path = os.path.abspath(dst_path)
+    return os.path.join(os.path.dirname(dst_path), f"{_TMP_DIR_PREFIX}{os.path.basename(dst_path)}")
+
+
+def _remove_stale_tmp_dirs(dst_path):
+    """ Remove the temporary download directories left behind by an interrupted download. """
+    shutil.rmtree(_get_tmp_area(dst_path), ignore_errors=True)
+    if os.path.isdir(dst_path):
+        for name in os.listdir(dst_path):
+            if name.startswith(_TMP_DIR_PREFIX):
+                shutil.rmtree(os.path.join(dst_path, name), ignore_errors=True)
+
+
+def download_artifacts(mlflow_client, run_id, dst_path, max_workers=1, walker=None):
+    """
+    Download the artifacts of a run file by file, largest files first.
+    Files already present with the same size are skipped. Each file is downloaded to a temporary
+    directory next to dst_path and then renamed, so an interrupted download can be resumed at file granularity.
+    :param mlflow_client: MLflow client.
+    :param run_id: Run ID.
+    :param dst_path: Local destination directory.
+    :param max_workers: Number of files to download concurrently.
+    :param walker: ArtifactWalker to list the artifacts with. Default is a new walker of mlflow_client.
+    :return: Number of downloaded files and number of skipped files.
+    """
+    _remove_stale_tmp_dirs(dst_path)
+    walker = walker or ArtifactWalker(mlflow_client)
+    files = list(walker.list_files(run_id))
+    files.sort(key=lambda info: info.file_size or 0, reverse=True)
+    todo = [ info for info in files if not _is_downloaded(os.path.join(dst_path, info.path), info.file_size) ]
+    if len(todo) == 0:
+        return 0, len(files)
+    os.makedirs(dst_path, exist_ok=True)
+    tmp_area = _get_tmp_area(dst_path)
+
+    def download(info):
+        tmp_dir = os.path.join(tmp_area, uuid.uuid4().hex)
+        os.makedirs(tmp_dir)
+        try:
+            tmp_path = mlflow_client.download_artifacts(run_id, info.path, dst_path=tmp_dir)
+            path = os.path.join(dst_path, info.path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    try:
+        for _ in map_unordered(download, todo, max_workers):
+            pass
+    finally:
+        shutil.rmtree(tmp_area, ignore_errors=True)
+    return len(todo), len(files) - len(todo)
+
+
+def find_local_files(local_dir, file_name):
+    """
+    :return: Paths of the files named file_name under local_dir.
+    """
+    return [ os.path.join(root, file_name) for root, _, names in os.walk(local_dir) if file_name in names ]
+
+
+def _list_local_files(local_dir):
+    """
+    :return: List of (path, size) of the files under local_dir except temporary download directories.
+    """
+    files = []
+    for root, dirs, names in os.walk(local_dir):
+        dirs[:] = [ dir for dir in dirs if not dir.startswith(_TMP_DIR_PREFIX) ]
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, os.path.getsize(path)))
+    return files
+
+
+def _supports_multipart(repo):
+    """ Multipart upload is available in the artifact repositories of newer MLflow versions. """
+    return hasattr(repo, "create_multipart_upload") and hasattr(repo, "complete_multipart_upload")
+
+
+def _upload_part(local_file, credential, start, size):
+    with open(local_file, "rb") as f:
+        f.seek(start)
+        data = f.read(size)
+    rsp = requests.put(credential.url, data=data, headers=getattr(credential, "headers", None) or {}, timeout=(10, 300))
+    rsp.raise_for_status()
+    return credential.part_number, rsp.headers.get("ETag", "")
+
+
+def _multipart_upload(repo, local_file, file_size, artifact_path, max_workers):
+    from mlflow.entities.multipart_upload import MultipartUploadPart
+    num_parts = (file_size + PART_SIZE - 1) // PART_SIZE
+    create = repo.create_multipart_upload(local_file, num_parts, artifact_path)
+    try:
+        def upload(credential):
+            start = (credential.part_number - 1) * PART_SIZE
+            return _upload_part(local_file, credential, start, min(PART_SIZE, file_size - start))
+        etags = dict(map_unordered(upload, create.credentials, max_workers))
+        parts = [ MultipartUploadPart(part_number=num, etag=etags[num]) for num in sorted(etags) ]
+        repo.complete_multipart_upload(local_file, create.upload_id, parts, artifact_path)
+    except Exception:
+        repo.abort_multipart_upload(local_file, create.upload_id, artifact_path)
+        raise
+
+
+def upload_artifacts(artifact_uri, local_dir, max_workers=1, overlay=None):
+    """
+    Upload a local directory to an artifact URI file by file, largest files first.
+    Files larger than MULTIPART_THRESHOLD are uploaded in parallel parts when the artifact repository
+    supports multipart upload, else as one part.
+    :param artifact_uri: Destination artifact URI such as the artifact URI of a run.
+    :param local_dir: Local source directory.
+    :param max_workers: Number of files (or parts) to upload concurrently.
+    :param overlay: Dictionary of source file path to staged file path with the same file name.
+                    The staged file is uploaded in place of the source file.
+    :return: Number of uploaded files, number of uploaded bytes and duration in seconds.
+    """
+    start = time.time()
+    repo = get_artifact_repository(artifact_uri)
+    limiter = rate_limiter.get_limiter("artifacts")
+    multipart = _supports_multipart(repo)
+    overlay = overlay or {}
+    files = _list_local_files(local_dir)
+    files.sort(key=lambda file: file[1], reverse=True)
+
+    def upload(file):
+        path, size = file
+        artifact_path = os.path.relpath(os.path.dirname(path), local_dir)
+        artifact_path = None if artifact_path == "." else artifact_path.replace(os.sep, "/")
+        path = overlay.get(path, path)
+        if multipart and size > MULTIPART_THRESHOLD:
+            _multipart_upload(repo, path, size, artifact_path, max_workers)
+        else:
+            limiter.call(repo.log_artifact, path, artifact_path)
+
+    for _ in map_unordered(upload, files, max_workers):
+        pass
+    return len(files), sum(file[1] for file in files), time.time()-start
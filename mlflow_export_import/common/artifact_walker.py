@@ -0,0 +1,98 @@
+"""
+Concurrent breadth-first walker of the artifact tree of a run.
+
+All directories of a level are listed concurrently. Listings can be memoized per run so that
+several consumers of the same session do not list the same tree again.
+"""
+
+import sys
+import threading
+
+from mlflow_export_import.common.thread_utils import map_unordered
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class ArtifactWalker():
+
+    def __init__(self, mlflow_client, max_workers=DEFAULT_MAX_WORKERS, memoize=False):
+        """
+        :param mlflow_client: MLflow client.
+        :param max_workers: Number of directories to list concurrently.
+        :param memoize: Keep the directory listings of each run until forget() is called.
+                        Only use for trees that do not change during the session such as source runs.
+        """
+        self.mlflow_client = mlflow_client
+        self.max_workers = max(1, max_workers or 1)
+        self.memoize = memoize
+        self._listings = {}
+        self._lock = threading.Lock()
+
+
+    def list_dir(self, run_id, path=""):
+        """
+        :return: List of the FileInfo of the direct children of an artifact directory.
+        """
+        key = (run_id, path)
+        if self.memoize:
+            with self._lock:
+                listing = self._listings.get(key)
+            if listing is not None:
+                return listing
+        listing = self.mlflow_client.list_artifacts(run_id, path)
+        if self.memoize:
+            with self._lock:
+                self._listings[key] = listing
+        return listing
+
+
+    def walk(self, run_id, path="", max_level=sys.maxsize):
+        """
+        Walk the artifact tree breadth first.
+        :param run_id: Run ID.
+        :param path: Relative artifact path of the root directory.
+        :param max_level: Number of directory levels to list. Level 1 is the root directory.
+        :return: Generator of (FileInfo, level) of the files and directories. Each level is in listing order.
+        """
+        dirs = [ path ]
+        level = 0
+        while dirs and level < max_level:
+            listings = dict(map_unordered(lambda dir: (dir, self.list_dir(run_id, dir)), dirs, self.max_workers))
+            next_dirs = []
+            for dir in dirs:
+                for info in listings[dir]:
+                    yield info, level
+                    if info.is_dir:
+                        next_dirs.append(info.path)
+            dirs = next_dirs
+            level += 1
+
+
+    def list_files(self, run_id, path="", max_level=sys.maxsize):
+        """
+        :return: Generator of the FileInfo of the files (not directories) of the tree.
+        """
+        return (info for info, _ in self.walk(run_id, path, max_level) if not info.is_dir)
+
+
+    def get_summary(self, run_id, path="", max_level=sys.maxsize):
+        """
+        :return: Total size in bytes and number of the files of the tree.
+        """
+        num_bytes, num_files = 0, 0
+        for info in self.list_files(run_id, path, max_level):
+            num_bytes += info.file_size or 0
+            num_files += 1
+        return num_bytes, num_files
+
+
+    def forget(self, run_id=None):
+        """
+        Drop the memoized listings of a run, or of all runs if run_id is None.
+        """
+        with self._lock:
+            if run_id is None:
+                self._listings.clear()
+            else:
+                for key in [ key for key in self._listings if key[0] == run_id ]:
+                    del self._listings[key]
@@ -44,6 +44,42 @@ def opt_export_latest_versions(function):
     )(function)
     return function
 
+def opt_metric_workers(function):
+    function = click.option("--metric-workers",
+        help="Maximum number of metric histories of a run to fetch concurrently.",
+        type=int,
+        default=1,
+        show_default=True
+    )(function)
+    return function
+
+def opt_artifact_workers(function):
+    function = click.option("--artifact-workers",
+        help="Number of artifact files of a run to download concurrently.",
+        type=int,
+        default=1,
+        show_default=True
+    )(function)
+    return function
+
+def opt_metrics_format(function):
+    function = click.option("--metrics-format",
+        help="Format of metric histories. 'json' writes them inline in run.json. 'jsonl' (JSON Lines) or 'npy' (NumPy typed arrays) stream each metric's history to its own file in the run's 'metrics' directory.",
+        type=str,
+        default="json",
+        show_default=True
+    )(function)
+    return function
+
+def opt_run_workers(function):
+    function = click.option("--run-workers",
+        help="Number of runs of an experiment to export concurrently.",
+        type=int,
+        default=1,
+        show_default=True
+    )(function)
+    return function
+
 # == import
 
 def opt_input_dir(function):
@@ -83,6 +119,32 @@ def opt_dst_notebook_dir(function):
     )(function)
     return function
 
+def opt_import_run_workers(function):
+    function = click.option("--run-workers",
+        help="Number of runs of an experiment to import concurrently.",
+        type=int,
+        default=1,
+        show_default=True
+    )(function)
+    return function
+
+def opt_import_artifact_workers(function):
+    function = click.option("--artifact-workers",
+        help="Number of artifact files of a run to upload concurrently.",
+        type=int,
+        default=1,
+        show_default=True
+    )(function)
+    return function
+
+def opt_import_resume(function):
+    click.option("--resume",
+        help="Resume a previous import of the input directory. Runs, experiments and model versions recorded in its 'import_id_map.db' are skipped.",
+        type=bool,
+        default=False,
+        show_default=True)(function)
+    return function
+
 def opt_experiment_name(function):
     function = click.option("--experiment-name",
         help="Destination experiment name",
@@ -116,6 +178,39 @@ def opt_use_threads(function):
         show_default=True)(function)
     return function
 
+def opt_incremental(function):
+    click.option("--incremental",
+        help="Only export objects created or updated since the previous export into the output directory and merge them into it. \
+            The start time of each export is stored in 'export_state.json' in the output directory.",
+        type=bool,
+        default=False,
+        show_default=True)(function)
+    return function
+
+def opt_resume(function):
+    click.option("--resume",
+        help="Resume a previous export into the output directory. Runs and models recorded in its 'export_journal.jsonl' are skipped.",
+        type=bool,
+        default=False,
+        show_default=True)(function)
+    return function
+
+def opt_use_pipeline(function):
+    click.option("--use-pipeline",
+        help="Export with a staged pipeline where listing, run metadata, artifacts and notebooks are exported by separate workers.",
+        type=bool,
+        default=False,
+        show_default=True)(function)
+    return function
+
+def opt_pipeline_workers(function):
+    click.option("--pipeline-workers",
+        help="Number of workers per pipeline stage. Stages are 'listing', 'metadata', 'artifacts' and 'notebooks'. \
+            For example, 'metadata=8,artifacts=8'. Unspecified stages use their default ('listing=1,metadata=4,artifacts=4,notebooks=2').",
+        type=str,
+        required=False)(function)
+    return function
+
 def opt_delete_model(function):
     function = click.option("--delete-model",
         help="If the model exists, first delete the model and all its versions.",
@@ -128,7 +223,8 @@ def opt_delete_model(function):
 def opt_experiments(function):
     function = click.option("--experiments",
         help="Experiment names or IDs (comma delimited).  \
-               For example, 'sklearn_wine,sklearn_iris' or '1,2'. 'all' will export all experiments.",
+               For example, 'sklearn_wine,sklearn_iris' or '1,2'. 'all' will export all experiments. \
+               Names can be glob patterns such as 'sklearn*'.",
         type=str,
         required=True
     )(function)
@@ -152,3 +248,12 @@ def opt_verbose(function):
         show_default=True
     )(function)
     return function
+
+def opt_max_rates(function):
+    function = click.option("--max-rates",
+        help="Maximum requests per second of endpoint classes ('default', 'log_batch', 'get_metric_history', 'artifacts'). \
+              For example, 'default=100,log_batch=20'. By default calls are not limited until the server throttles.",
+        type=str,
+        required=False
+    )(function)
+    return function
@@ -3,13 +3,16 @@ Run dump utilities.
 """
 
 import time
+import posixpath
 import click
 import mlflow
+from mlflow_export_import.common.artifact_walker import ArtifactWalker
 
 INDENT = "  "
 MAX_LEVEL = 1
 TS_FORMAT = "%Y-%m-%d_%H:%M:%S"
 client = mlflow.tracking.MlflowClient()
+walker = ArtifactWalker(client, memoize=True)
 print("MLflow Tracking URI:", mlflow.get_tracking_uri())
 
 def dump_run(run, max_level=1, indent=""):
@@ -24,7 +27,8 @@ def dump_run(run, max_level=1, indent=""):
     for k,v in sorted(run.data.tags.items()):
         print(indent+"  {}: {}".format(k,v))
     print("{}Artifacts:".format(indent))
-    num_bytes, num_artifacts = dump_artifacts(run.info.run_id, "", 0, max_level, indent+INDENT)
+    listings = _list_artifact_tree(run.info.run_id, max_level)
+    num_bytes, num_artifacts = dump_artifacts(listings, "", 0, max_level, indent+INDENT)
     print(f"{indent}Total: bytes: {num_bytes} artifacts: {num_artifacts}")
     return run, num_bytes, num_artifacts
         
@@ -57,17 +61,24 @@ def _dump_time(info, k, indent=""):
         print("{}  {:<11} {}   {}".format(indent,k[1:]+":",stime,v))
     return v
 
-def dump_artifacts(run_id, path, level, max_level, indent):
+def _list_artifact_tree(run_id, max_level):
+    """ Lists the artifact tree concurrently. Returns a dictionary of directory path to its listing. """
+    listings = { "": [] }
+    for art,level in walker.walk(run_id, "", max_level):
+        listings.setdefault(posixpath.dirname(art.path), []).append(art)
+    return listings
+
+def dump_artifacts(listings, path, level, max_level, indent):
     if level+1 > max_level: 
         return 0,0
-    artifacts = client.list_artifacts(run_id,path)
+    artifacts = listings.get(path, [])
     num_bytes, num_artifacts = (0,0)
     for j,art in enumerate(artifacts):
         print("{}Artifact {}/{} - level {}:".format(indent,j+1,len(artifacts),level))
         num_bytes += art.file_size or 0
         print(f"  {indent}path: {art.path}")
         if art.is_dir:
-            b,a = dump_artifacts(run_id, art.path, level+1, max_level, indent+INDENT)
+            b,a = dump_artifacts(listings, art.path, level+1, max_level, indent+INDENT)
             num_bytes += b
             num_artifacts += a
         else:
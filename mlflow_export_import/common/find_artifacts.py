@@ -6,25 +6,14 @@ import sys
 import os
 import click
 import mlflow
+from mlflow_export_import.common.artifact_walker import ArtifactWalker
 
 client = mlflow.tracking.MlflowClient()
+walker = ArtifactWalker(client, memoize=True)
 print("MLflow Tracking URI:", mlflow.get_tracking_uri())
 
 def find_artifacts(run_id, path, target, max_level=sys.maxsize):
-    return _find_artifacts(run_id, path, target, max_level, 0, [])
-
-def _find_artifacts(run_id, path, target, max_level, level, matches):
-    if level+1 > max_level: 
-        return matches
-    artifacts = client.list_artifacts(run_id,path)
-    for art in artifacts:
-        #print(f"art_path: {art.path}")
-        filename = os.path.basename(art.path)
-        if filename == target:
-            matches.append(art.path)
-        if art.is_dir:
-            _find_artifacts(run_id, art.path, target, max_level, level+1, matches)
-    return matches
+    return [ art.path for art,_ in walker.walk(run_id, path, max_level) if os.path.basename(art.path) == target ]
 
 @click.command()
 @click.option("--run-id", help="Run ID.", required=True, type=str)
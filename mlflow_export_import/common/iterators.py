@@ -1,12 +1,30 @@
+import queue
+import inspect
+import threading
+import mlflow
 from abc import abstractmethod, ABCMeta
 from mlflow.entities import ViewType
 
 MAX_RESULTS = 500
+DEFAULT_PREFETCH = 2 # pages
+
+_END = object()
+_PUT_TIMEOUT = 0.5 # seconds between checks whether the consumer closed the iterator
+
 
 class BaseIterator(metaclass=ABCMeta):
     """
     Base class to iterate for list methods that return PageList.
+
+    With prefetch > 0, pages are fetched by a background thread up to 'prefetch' pages ahead of the
+    page being consumed, so the consumer does not wait a round-trip at each page boundary.
+    The thread stops when the iteration ends, when the iteration is garbage collected or when the
+    iterator is closed, e.g. at the end of a 'with' block:
+        with SearchRunsIterator(client, experiment_id, prefetch=2) as runs:
+            for run in runs:
+                ...
     """
+    server_max_results = None
 
     @abstractmethod
     def _call_iter(self):
@@ -16,17 +34,37 @@ class BaseIterator(metaclass=ABCMeta):
     def _call_next(self):
         pass
 
-    def __init__(self, client, max_results=MAX_RESULTS, filter=None):
+    def __init__(self, client, max_results=MAX_RESULTS, filter=None, prefetch=0):
+        """
+        :param client: MLflow client.
+        :param max_results: Page size. Capped at the server maximum of the search method.
+        :param filter: Search filter.
+        :param prefetch: Number of pages to fetch ahead in a background thread. 0 fetches each page when it is needed.
+        """
         self.client = client
         self.filter = filter
+        if self.server_max_results and max_results > self.server_max_results:
+            print(f"WARNING: max_results {max_results} exceeds the server maximum of {self.server_max_results}. Using {self.server_max_results}.")
+            max_results = self.server_max_results
         self.max_results = max_results
+        self.prefetch = prefetch
         self.idx = 0
         self.paged_list = None
+        self._pages = None
+        self._closed = threading.Event()
 
     def __iter__(self):
+        if self.prefetch > 0:
+            return self._iter_prefetched()
         self.paged_list = self._call_iter()
         return self
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def __next__(self):
         if self.idx < len(self.paged_list):
             model = self.paged_list[self.idx]
@@ -41,6 +79,50 @@ class BaseIterator(metaclass=ABCMeta):
             self.idx = 1
             return self.paged_list[0]
 
+    def close(self):
+        """ Stop the background fetching of an iterator that is not consumed to the end. """
+        self._closed.set()
+
+    def _iter_prefetched(self):
+        """
+        Generator of the items of the pages fetched by the background thread.
+        Closing the generator, explicitly or when it is garbage collected, stops the thread.
+        """
+        self._pages = queue.Queue(maxsize=self.prefetch)
+        threading.Thread(target=self._fetch_pages, daemon=True).start()
+        try:
+            while True:
+                page = self._pages.get()
+                if page is _END:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                for self.idx, item in enumerate(page, 1):
+                    yield item
+        finally:
+            self.close()
+
+    def _fetch_pages(self):
+        """ Background thread. Only this thread sets self.paged_list. """
+        try:
+            self.paged_list = self._call_iter()
+            while self._put(self.paged_list):
+                if self.paged_list.token is None or self.paged_list.token == "" or len(self.paged_list) == 0:
+                    self._put(_END)
+                    return
+                self.paged_list = self._call_next()
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, page):
+        while not self._closed.is_set():
+            try:
+                self._pages.put(page, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
 
 class SearchExperimentsIterator(BaseIterator):
     """
@@ -50,8 +132,10 @@ class SearchExperimentsIterator(BaseIterator):
             print(experiment)
     """
 
-    def __init__(self, client, view_type=ViewType.ACTIVE_ONLY, max_results=MAX_RESULTS, filter=None):
-        super().__init__(client, max_results, filter)
+    server_max_results = 50000
+
+    def __init__(self, client, view_type=ViewType.ACTIVE_ONLY, max_results=MAX_RESULTS, filter=None, prefetch=0):
+        super().__init__(client, max_results, filter, prefetch)
         self.view_type = view_type
 
     def _call_iter(self):
@@ -63,8 +147,10 @@ class SearchExperimentsIterator(BaseIterator):
 
 
 class SearchRunsIterator(BaseIterator):
-    def __init__(self, client, experiment_id, max_results=MAX_RESULTS, filter=None):
-        super().__init__(client, max_results, filter)
+    server_max_results = 50000
+
+    def __init__(self, client, experiment_id, max_results=MAX_RESULTS, filter=None, prefetch=0):
+        super().__init__(client, max_results, filter, prefetch)
         self.experiment_id = experiment_id
 
     def _call_iter(self):
@@ -81,8 +167,10 @@ class SearchRegisteredModelsIterator(BaseIterator):
         for model in models:
             print(model)
     """
-    def __init__(self, client, max_results=MAX_RESULTS, filter=None):
-        super().__init__(client, max_results, filter)
+    server_max_results = 1000
+
+    def __init__(self, client, max_results=MAX_RESULTS, filter=None, prefetch=0):
+        super().__init__(client, max_results, filter, prefetch)
 
     def _call_iter(self):
         return self.client.search_registered_models(self.filter, max_results=self.max_results)
@@ -94,15 +182,24 @@ class SearchRegisteredModelsIterator(BaseIterator):
 class SearchModelVersionsIterator(BaseIterator):
     """
     Usage:
-        models = SearchRegisteredModelsIterator(client)
-        for model in models:
-            print(model)
+        versions = SearchModelVersionsIterator(client, filter="name='my_model'")
+        for vr in versions:
+            print(vr)
+
+    Older MLflow versions such as 2.1 have no 'max_results' and 'page_token' for search_model_versions
+    and return all matching versions in one page. There 'max_results' is ignored.
     """
-    def __init__(self, client, filter=None):
-        super().__init__(client, filter=filter)
+    server_max_results = 10000
+
+    def __init__(self, client, max_results=MAX_RESULTS, filter=None, prefetch=0):
+        super().__init__(client, max_results, filter, prefetch)
+        self._kwargs = { "max_results": self.max_results } if _supports_max_results else {}
 
     def _call_iter(self):
-        return self.client.search_model_versions(self.filter)
+        return self.client.search_model_versions(self.filter, **self._kwargs)
 
     def _call_next(self):
-        return self.client.search_model_versions(self.filter, page_token=self.paged_list.token)
+        return self.client.search_model_versions(self.filter, page_token=self.paged_list.token, **self._kwargs)
+
+
+_supports_max_results = "max_results" in inspect.signature(mlflow.client.MlflowClient.search_model_versions).parameters
@@ -0,0 +1,88 @@
+"""
+Size-bounded LRU cache of experiment and run metadata shared by the exporters of a bulk export.
+"""
+
+import threading
+from collections import OrderedDict
+
+MAX_RUNS = 1000
+MAX_EXPERIMENTS = 1000
+
+
+class LruCache():
+
+    def __init__(self, max_size):
+        """
+        :param max_size: Maximum number of entries. The least recently used entry is evicted first.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key, load):
+        """
+        :param key: Cache key.
+        :param load: Function of the key that loads the value on a miss.
+        :return: Cached or loaded value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+        value = load(key)
+        self.put(key, value)
+        return value
+
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MetadataCache():
+
+    def __init__(self, mlflow_client, max_runs=MAX_RUNS, max_experiments=MAX_EXPERIMENTS):
+        """
+        :param mlflow_client: MLflow client used on cache misses.
+        :param max_runs: Maximum number of cached runs.
+        :param max_experiments: Maximum number of cached experiments.
+        """
+        self.mlflow_client = mlflow_client
+        self.runs = LruCache(max_runs)
+        self.experiments = LruCache(max_experiments)
+
+
+    def get_run(self, run_id):
+        return self.runs.get(run_id, self.mlflow_client.get_run)
+
+
+    def get_experiment(self, experiment_id):
+        return self.experiments.get(experiment_id, self.mlflow_client.get_experiment)
+
+
+    def get_stats(self):
+        """
+        :return: Dictionary of hits and misses of the run and experiment caches.
+        """
+        return {
+            "runs": { "hits": self.runs.hits, "misses": self.runs.misses },
+            "experiments": { "hits": self.experiments.hits, "misses": self.experiments.misses }
+        }
+
+
+    def report(self):
+        stats = self.get_stats()
+        print(f"Metadata cache: runs: {stats['runs']['hits']} hits {stats['runs']['misses']} misses - " \
+            f"experiments: {stats['experiments']['hits']} hits {stats['experiments']['misses']} misses")
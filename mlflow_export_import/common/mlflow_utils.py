@@ -1,4 +1,5 @@
 import os
+import threading
 from mlflow.exceptions import RestException
 from mlflow_export_import.common import MlflowExportImportException
 
@@ -37,15 +38,16 @@ def get_experiment(mlflow_client, exp_id_or_name):
 
 
 
-def set_experiment(mlflow_client, dbx_client, exp_name, tags=None, is_create_new_exp=False):
+def set_experiment(mlflow_client, dbx_client, exp_name, tags=None, is_create_new_exp=False, created_dirs=None):
     """
     Set experiment name. 
     For Databricks, create the workspace directory if it doesn't exist.
+    :param created_dirs: Set of workspace directories already created in this session.
     :return: Experiment ID
     """
     from mlflow_export_import.common import utils
     if utils.importing_into_databricks():
-        create_workspace_dir(dbx_client, os.path.dirname(exp_name))
+        create_workspace_dir(dbx_client, os.path.dirname(exp_name), created_dirs)
 
     if not tags: tags = {}
     tags = utils.create_mlflow_tags_for_databricks_import(tags)
@@ -86,12 +88,50 @@ def get_last_run(mlflow_client, exp_id_or_name):
     return runs[0]
 
 
-def create_workspace_dir(dbx_client, workspace_dir):
+def create_workspace_dir(dbx_client, workspace_dir, created_dirs=None):
     """
     Create Databricks workspace directory.
+    :param created_dirs: Set of workspace directories already created in this session.
+                         The directory is not created again if it is in the set, and is added to it.
     """
+    if created_dirs is not None and workspace_dir in created_dirs:
+        return
     print(f"Creating Databricks workspace directory '{workspace_dir}'")
     dbx_client.post("workspace/mkdirs", { "path": workspace_dir })
+    if created_dirs is not None:
+        created_dirs.add(workspace_dir)
+
+
+class ExperimentResolver():
+    """
+    Session cache of destination experiments by name and of the Databricks workspace directories already created.
+    """
+
+    def __init__(self, mlflow_client, dbx_client):
+        self.mlflow_client = mlflow_client
+        self.dbx_client = dbx_client
+        self.created_dirs = set()
+        self._experiments = {}
+        self._lock = threading.Lock()
+
+
+    def set_experiment(self, exp_name, tags=None):
+        """
+        Resolve an experiment name with set_experiment() once per session.
+        :return: Experiment.
+        """
+        with self._lock:
+            exp = self._experiments.get(exp_name)
+        if exp is None:
+            exp_id = set_experiment(self.mlflow_client, self.dbx_client, exp_name, tags, created_dirs=self.created_dirs)
+            exp = self.mlflow_client.get_experiment(exp_id)
+            with self._lock:
+                self._experiments[exp_name] = exp
+        return exp
+
+
+    def create_workspace_dir(self, workspace_dir):
+        create_workspace_dir(self.dbx_client, workspace_dir, self.created_dirs)
 
 
 # == Dump exception functions
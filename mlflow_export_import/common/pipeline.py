@@ -0,0 +1,104 @@
+"""
+Staged producer/consumer pipeline.
+
+Each stage has its own worker threads and reads items from a bounded queue fed by the previous stage.
+Stages therefore overlap - e.g. network-bound and disk-bound work - and a slow stage applies
+backpressure upstream instead of letting items pile up in memory.
+"""
+
+import queue
+import threading
+import traceback
+
+_END = object()
+
+
+class Stage:
+    def __init__(self, name, func, num_workers=1):
+        """
+        :param name: Stage name.
+        :param func: Function called with each input item. Returns an iterable of items for the next stage or None.
+        :param num_workers: Number of worker threads of the stage.
+        """
+        self.name = name
+        self.func = func
+        self.num_workers = max(1, num_workers)
+
+
+class Pipeline:
+    """
+    Usage:
+        pipeline = Pipeline([ Stage("list", list_func, 2), Stage("download", download_func, 8) ])
+        for item in pipeline.run(items):
+            print(item)
+    """
+
+    def __init__(self, stages, queue_size=100):
+        """
+        :param stages: List of stages.
+        :param queue_size: Maximum number of items waiting in the queue in front of each stage.
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.errors = []
+        self._lock = threading.Lock()
+
+
+    def run(self, items):
+        """
+        Feed items to the first stage.
+        :return: Generator of the items returned by the last stage.
+        """
+        queues = [ queue.Queue(maxsize=self.queue_size) for _ in self.stages ]
+        queues.append(queue.Queue(maxsize=self.queue_size))
+        threads = [ threading.Thread(target=self._feed, args=(items, queues[0]), name="pipeline-feed", daemon=True) ]
+        for j,stage in enumerate(self.stages):
+            remaining = [ stage.num_workers ]
+            for k in range(stage.num_workers):
+                threads.append(threading.Thread(target=self._work,
+                    args=(stage, queues[j], queues[j+1], remaining),
+                    name=f"pipeline-{stage.name}-{k}", daemon=True))
+        for thread in threads:
+            thread.start()
+        while True:
+            item = queues[-1].get()
+            if item is _END:
+                break
+            yield item
+        for thread in threads:
+            thread.join()
+
+
+    def _feed(self, items, out_queue):
+        try:
+            for item in items:
+                out_queue.put(item)
+        except Exception as e:
+            self._add_error("feed", e)
+        finally:
+            out_queue.put(_END)
+
+
+    def _work(self, stage, in_queue, out_queue, remaining):
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                in_queue.put(_END) # let the other workers of this stage see the end too
+                break
+            try:
+                for out_item in stage.func(item) or []:
+                    out_queue.put(out_item)
+            except Exception as e:
+                self._add_error(stage.name, e)
+        with self._lock:
+            remaining[0] -= 1
+            is_last = remaining[0] == 0
+        if is_last:
+            out_queue.put(_END)
+
+
+    def _add_error(self, stage_name, ex):
+        print(f"ERROR: Pipeline stage '{stage_name}' failed: {ex}")
+        traceback.print_exc()
+        with self._lock:
+            self.errors.append({ "stage": stage_name, "error": str(ex) })
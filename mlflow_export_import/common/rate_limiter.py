@@ -0,0 +1,220 @@
+"""
+Process-wide adaptive rate limiter for REST calls.
+
+Each endpoint class (e.g. 'log_batch', 'get_metric_history') has a limiter that passes calls through
+until the server throttles (HTTP 429 or 503). It then limits the endpoint class with a token bucket
+whose rate is adjusted with AIMD (additive increase, multiplicative decrease): the rate is halved
+on each throttling and grows by about one request per second per second otherwise.
+All export and import workers share the same limiters.
+
+Optional ceilings in requests per second can be set with configure(), the '--max-rates' option or
+the environment variable MLFLOW_EXPORT_IMPORT_MAX_RATES such as 'default=100,log_batch=20'.
+An endpoint class with a ceiling is limited from the start at its ceiling.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from mlflow.exceptions import MlflowException
+from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common.retry_utils import is_rate_limited
+
+DEFAULT_MAX_RATES = {} # no ceilings - calls pass through until the server throttles
+MIN_RATE = 1.0 # requests per second
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 1.0 # seconds between rate cuts so a burst of throttled in-flight calls only cuts once
+_RATE_WINDOW = 1.0 # seconds of calls used to measure the unlimited call rate
+_MAX_RATES_ENV_VAR = "MLFLOW_EXPORT_IMPORT_MAX_RATES"
+
+_METHOD_ENDPOINT_CLASSES = {
+    "log_batch": "log_batch",
+    "get_metric_history": "get_metric_history",
+    "list_artifacts": "artifacts",
+    "download_artifacts": "artifacts",
+    "log_artifact": "artifacts",
+    "log_artifacts": "artifacts"
+}
+_RESOURCE_ENDPOINT_CLASSES = {
+    "runs/log-batch": "log_batch",
+    "metrics/get-history": "get_metric_history",
+    "artifacts/list": "artifacts"
+}
+
+
+class AdaptiveRateLimiter():
+
+    def __init__(self, name, max_rate=None, min_rate=MIN_RATE):
+        """
+        :param name: Endpoint class name.
+        :param max_rate: Ceiling of requests per second. If None, calls are not limited until the server throttles.
+        :param min_rate: Floor of requests per second.
+        """
+        self.name = name
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate else min_rate
+        self.rate = max_rate # None is unlimited
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._calls = deque() # start times of the calls of the last _RATE_WINDOW seconds while unlimited
+        self._lock = threading.Lock()
+
+
+    def acquire(self):
+        """ Block until the bucket has a token. Returns at once while the limiter is unlimited. """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.rate is None:
+                    self._calls.append(now)
+                    while self._calls[0] < now - _RATE_WINDOW:
+                        self._calls.popleft()
+                    return
+                self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+    def on_success(self):
+        """ Additive increase of about one request per second per second up to the ceiling. """
+        with self._lock:
+            if self.rate is not None:
+                rate = self.rate + 1.0 / self.rate
+                self.rate = min(self.max_rate, rate) if self.max_rate else rate
+
+
+    def on_throttled(self):
+        """ Multiplicative decrease. An unlimited limiter starts limiting at half its current call rate. """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < DECREASE_COOLDOWN:
+                return
+            self._last_decrease = now
+            current_rate = self.rate if self.rate is not None else len(self._calls) / _RATE_WINDOW
+            self.rate = max(self.min_rate, current_rate * DECREASE_FACTOR)
+            self._tokens = 0.0
+            self._last_refill = now
+            self._calls.clear()
+            rate = self.rate
+        print(f"WARNING: Throttled calling '{self.name}' endpoints. Reducing rate to {round(rate,1)} requests/second.")
+
+
+    def call(self, func, *args, **kwargs):
+        """ Call a function once the rate allows it and adjust the rate to the outcome. """
+        self.acquire()
+        try:
+            res = func(*args, **kwargs)
+        except (MlflowException, MlflowExportImportException) as ex:
+            if is_throttled(ex):
+                self.on_throttled()
+            raise
+        self.on_success()
+        return res
+
+
+_limiters = {}
+_max_rates = None
+_limiters_lock = threading.Lock()
+
+
+def parse_max_rates(value):
+    """
+    :param value: String such as 'default=100,log_batch=20'.
+    :return: Dictionary of endpoint class to maximum requests per second.
+    """
+    rates = {}
+    for entry in value.split(","):
+        name, _, rate = entry.partition("=")
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            raise MlflowExportImportException(
+                f"Bad rate '{entry}' in '{value}'. Format is 'endpoint_class=requests_per_second'.",
+                http_status_code=400)
+    return rates
+
+
+def configure(max_rates):
+    """
+    Set the ceilings of endpoint classes. Resets the current rates.
+    :param max_rates: Dictionary of endpoint class to maximum requests per second.
+    """
+    global _max_rates
+    with _limiters_lock:
+        _max_rates = { **DEFAULT_MAX_RATES, **max_rates }
+        _limiters.clear()
+
+
+def configure_max_rates(value):
+    """
+    Set the ceilings of endpoint classes from an option string such as 'default=100,log_batch=20'.
+    Nothing is changed if the value is empty.
+    """
+    if value:
+        configure(parse_max_rates(value))
+
+
+def get_limiter(endpoint_class):
+    global _max_rates
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint_class)
+        if limiter is None:
+            if _max_rates is None:
+                env_rates = os.environ.get(_MAX_RATES_ENV_VAR)
+                _max_rates = { **DEFAULT_MAX_RATES, **(parse_max_rates(env_rates) if env_rates else {}) }
+            max_rate = _max_rates.get(endpoint_class, _max_rates.get("default"))
+            limiter = AdaptiveRateLimiter(endpoint_class, max_rate)
+            _limiters[endpoint_class] = limiter
+    return limiter
+
+
+def is_throttled(ex):
+    """ Returns True if the exception is an HTTP 429 or 503 error. """
+    if is_rate_limited(ex):
+        return True
+    if isinstance(ex, MlflowException):
+        return ex.get_http_status_code() == 503 or ex.error_code == "TEMPORARILY_UNAVAILABLE"
+    return isinstance(ex, MlflowExportImportException) and ex.http_status_code == 503
+
+
+def get_method_endpoint_class(method_name):
+    return _METHOD_ENDPOINT_CLASSES.get(method_name, "default")
+
+
+def get_resource_endpoint_class(resource):
+    return _RESOURCE_ENDPOINT_CLASSES.get(resource, "default")
+
+
+class RateLimitedMlflowClient():
+    """
+    MlflowClient proxy whose method calls pass through the rate limiter of their endpoint class.
+    """
+    def __init__(self, mlflow_client):
+        self._mlflow_client = mlflow_client
+
+    def __getattr__(self, name):
+        attr = getattr(self._mlflow_client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        limiter = get_limiter(get_method_endpoint_class(name))
+        def call(*args, **kwargs):
+            return limiter.call(attr, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def __repr__(self):
+        return repr(self._mlflow_client)
+
+
+def limit_client(mlflow_client):
+    """
+    :return: Rate limited proxy of an MlflowClient. A client that is already rate limited is returned as is.
+    """
+    if isinstance(mlflow_client, RateLimitedMlflowClient):
+        return mlflow_client
+    return RateLimitedMlflowClient(mlflow_client)
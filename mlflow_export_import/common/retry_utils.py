@@ -0,0 +1,42 @@
+"""
+Retry with exponential backoff for throttled (HTTP 429) MLflow calls.
+"""
+
+import time
+import random
+from mlflow.exceptions import MlflowException
+from mlflow_export_import.common import MlflowExportImportException
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0 # seconds
+BACKOFF_MAX = 60.0 # seconds
+_RATE_LIMIT_ERROR_CODE = "REQUEST_LIMIT_EXCEEDED"
+
+
+def is_rate_limited(ex):
+    """ Returns True if the exception is an HTTP 429 'Too Many Requests' error. """
+    if isinstance(ex, MlflowException):
+        return ex.get_http_status_code() == 429 or ex.error_code == _RATE_LIMIT_ERROR_CODE
+    if isinstance(ex, MlflowExportImportException):
+        return ex.http_status_code == 429
+    return False
+
+
+def backoff_seconds(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """ Exponential backoff with full jitter. """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def call_with_backoff(func, *args, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Call a function and retry it with exponential backoff while it is rate limited.
+    """
+    for attempt in range(max_retries+1):
+        try:
+            return func(*args, **kwargs)
+        except (MlflowException, MlflowExportImportException) as ex:
+            if attempt == max_retries or not is_rate_limited(ex):
+                raise
+            seconds = backoff_seconds(attempt)
+            print(f"WARNING: Rate limited calling '{func.__name__}'. Retrying in {round(seconds,1)} seconds. Attempt {attempt+1}/{max_retries}.")
+            time.sleep(seconds)
@@ -0,0 +1,34 @@
+"""
+Thread pool utilities.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def map_unordered(func, items, max_workers, max_pending=None):
+    """
+    Apply a function to each item with a thread pool.
+    Items are consumed lazily so that at most max_pending of them are submitted but not yet completed.
+    :param func: Function to apply to each item.
+    :param items: Iterable (or generator) of items.
+    :param max_workers: Number of threads. If 1, items are processed serially in the calling thread.
+    :param max_pending: Maximum number of submitted but not completed items. Default is twice max_workers.
+    :return: Generator of results in completion order.
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    max_pending = max(max_pending or 2*max_workers, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(func, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -6,24 +6,44 @@ import os
 import click
 import mlflow
 
-from mlflow_export_import.common.click_options import opt_experiment, opt_output_dir, opt_notebook_formats
-from mlflow_export_import.common.iterators import SearchRunsIterator
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_experiment, opt_output_dir, opt_notebook_formats, \
+    opt_metric_workers, opt_metrics_format, opt_run_workers, opt_artifact_workers
+from mlflow_export_import.common.iterators import SearchRunsIterator, DEFAULT_PREFETCH
 from mlflow_export_import.common import io_utils
 from mlflow_export_import.common import utils
 from mlflow_export_import.common import mlflow_utils
+from mlflow_export_import.common.thread_utils import map_unordered
 from mlflow_export_import.common.timestamp_utils import fmt_ts_millis
+from mlflow_export_import.client import http_client
+from mlflow_export_import.run import export_run
 from mlflow_export_import.run.export_run import RunExporter
 
 
 class ExperimentExporter():
 
-    def __init__(self, mlflow_client, notebook_formats=None):
+    def __init__(self, mlflow_client, notebook_formats=None, metric_workers=1, metrics_format="json", run_workers=1, journal=None,
+            artifact_workers=1, metadata_cache=None):
         """
         :param mlflow_client: MLflow client.
         :param notebook_formats: List of notebook formats to export. Values are SOURCE, HTML, JUPYTER or DBC.
+        :param metric_workers: Maximum number of metric histories of a run to fetch concurrently.
+        :param metrics_format: Format of metric histories. Values are 'json' (inline in run.json), 'jsonl' or 'npy' (sidecar files).
+        :param run_workers: Number of runs of an experiment to export concurrently.
+        :param journal: Bulk export journal. Runs already in the journal are skipped and exported runs are added to it.
+        :param artifact_workers: Number of artifact files of a run to download concurrently.
+        :param metadata_cache: MetadataCache shared with other exporters. Runs are fetched through it.
         """
         self.mlflow_client = mlflow_client
-        self.run_exporter = RunExporter(self.mlflow_client, notebook_formats=notebook_formats)
+        self.run_workers = max(1, run_workers or 1)
+        self.journal = journal
+        http_client.set_pool_size(self.run_workers * export_run.get_pool_size(metric_workers, artifact_workers))
+        self.run_exporter = RunExporter(self.mlflow_client,
+            notebook_formats=notebook_formats,
+            metric_workers=metric_workers,
+            metrics_format=metrics_format,
+            artifact_workers=artifact_workers,
+            metadata_cache=metadata_cache)
 
 
     def export_experiment(self, exp_id_or_name, output_dir, run_ids=None):
@@ -35,62 +55,95 @@ class ExperimentExporter():
         """
         exp = mlflow_utils.get_experiment(self.mlflow_client, exp_id_or_name)
         print(f"Exporting experiment '{exp.name}' (ID {exp.experiment_id}) to '{output_dir}'")
-        ok_run_ids = []
-        failed_run_ids = []
-        j = -1
-        if run_ids:
-            for j,run_id in enumerate(run_ids):
-                run = self.mlflow_client.get_run(run_id)
-                self._export_run(j, run, output_dir, ok_run_ids, failed_run_ids)
+        done_run_ids = self.journal.get_run_ids(exp.experiment_id) if self.journal else []
+        if run_ids is not None:
+            if self.journal:
+                run_ids = [ run_id for run_id in run_ids if not self.journal.is_run_done(run_id) ]
+            runs = ( self.mlflow_client.get_run(run_id) for run_id in run_ids )
+            results = self._export_runs(runs, output_dir)
         else:
-            for j,run in enumerate(SearchRunsIterator(self.mlflow_client, exp.experiment_id)):
-                self._export_run(j, run, output_dir, ok_run_ids, failed_run_ids)
-
-        info_attr = {
-            "num_total_runs": (j+1),
-            "num_ok_runs": len(ok_run_ids),
-            "num_failed_runs": len(failed_run_ids),
-            "failed_runs": failed_run_ids
-        }
-        exp_dct = utils.strip_underscores(exp) 
-        exp_dct["_creation_time"] = fmt_ts_millis(exp.creation_time)
-        exp_dct["_last_update_time"] = fmt_ts_millis(exp.last_update_time)
-        exp_dct["tags"] = dict(sorted(exp_dct["tags"].items()))
-
-        mlflow_attr = { "experiment": exp_dct , "runs": ok_run_ids }
-        io_utils.write_export_file(output_dir, "experiment.json", __file__, mlflow_attr, info_attr)
+            with SearchRunsIterator(self.mlflow_client, exp.experiment_id, prefetch=DEFAULT_PREFETCH) as runs:
+                if self.journal:
+                    runs = ( run for run in runs if not self.journal.is_run_done(run.info.run_id) )
+                results = self._export_runs(runs, output_dir)
+        ok_run_ids = done_run_ids + [ run_id for run_id,ok in results if ok ]
+        failed_run_ids = [ run_id for run_id,ok in results if not ok ]
+        num_total_runs = len(ok_run_ids) + len(failed_run_ids)
+
+        write_experiment_export_file(exp, output_dir, ok_run_ids, failed_run_ids)
 
         msg = f"for experiment '{exp.name}' (ID: {exp.experiment_id})"
         if len(failed_run_ids) == 0:
             print(f"All {len(ok_run_ids)} runs succesfully exported {msg}")
         else:
-            print(f"{len(ok_run_ids)/j} runs succesfully exported {msg}")
-            print(f"{len(failed_run_ids)/j} runs failed {msg}")
+            print(f"{len(ok_run_ids)}/{num_total_runs} runs succesfully exported {msg}")
+            print(f"{len(failed_run_ids)}/{num_total_runs} runs failed {msg}")
         return len(ok_run_ids), len(failed_run_ids) 
 
 
-    def _export_run(self, idx, run, output_dir, ok_run_ids, failed_run_ids):
+    def _export_runs(self, runs, output_dir):
+        """
+        Export runs serially or, with more than one run worker, concurrently as the iterator returns them.
+        Results are only collected in the calling thread.
+        :return: List of (run ID, export succeeded) in iteration order.
+        """
+        def export_run(idx_run):
+            idx, run = idx_run
+            return idx, run.info.run_id, self._export_run(idx, run, output_dir)
+        results = { idx:(run_id,res) for idx,run_id,res in map_unordered(export_run, enumerate(runs), self.run_workers) }
+        return [ results[idx] for idx in sorted(results) ]
+
+
+    def _export_run(self, idx, run, output_dir):
         run_dir = os.path.join(output_dir, run.info.run_id)
         print(f"Exporting run {idx+1}: {run.info.run_id} of experiment {run.info.experiment_id}")
-        res = self.run_exporter.export_run(run.info.run_id, run_dir)
-        if res:
-            ok_run_ids.append(run.info.run_id)
-        else:
-            failed_run_ids.append(run.info.run_id)
+        ok = self.run_exporter.export_run(run.info.run_id, run_dir)
+        if ok and self.journal:
+            self.journal.add_run(run.info.experiment_id, run.info.run_id)
+        return ok
+
+
+def write_experiment_export_file(exp, output_dir, ok_run_ids, failed_run_ids):
+    """
+    Write experiment.json for an exported experiment.
+    """
+    info_attr = {
+        "num_total_runs": len(ok_run_ids) + len(failed_run_ids),
+        "num_ok_runs": len(ok_run_ids),
+        "num_failed_runs": len(failed_run_ids),
+        "failed_runs": failed_run_ids
+    }
+    exp_dct = utils.strip_underscores(exp) 
+    exp_dct["_creation_time"] = fmt_ts_millis(exp.creation_time)
+    exp_dct["_last_update_time"] = fmt_ts_millis(exp.last_update_time)
+    exp_dct["tags"] = dict(sorted(exp_dct["tags"].items()))
+
+    mlflow_attr = { "experiment": exp_dct , "runs": ok_run_ids }
+    io_utils.write_export_file(output_dir, "experiment.json", __file__, mlflow_attr, info_attr)
 
 
 @click.command()
 @opt_experiment
 @opt_output_dir
 @opt_notebook_formats
-def main(experiment, output_dir, notebook_formats):
+@opt_metric_workers
+@opt_metrics_format
+@opt_run_workers
+@opt_artifact_workers
+@opt_max_rates
+def main(experiment, output_dir, notebook_formats, metric_workers, metrics_format, run_workers, artifact_workers, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     exporter = ExperimentExporter(
         client,
-        notebook_formats=utils.string_to_list(notebook_formats))
+        notebook_formats=utils.string_to_list(notebook_formats),
+        metric_workers=metric_workers,
+        metrics_format=metrics_format,
+        run_workers=run_workers,
+        artifact_workers=artifact_workers)
     exporter.export_experiment(experiment, output_dir)
 
 
@@ -6,33 +6,44 @@ import os
 import click
 import mlflow
 
-from mlflow_export_import.common.click_options import opt_experiment_name, opt_input_dir, opt_import_source_tags, \
-    opt_use_src_user_id, opt_dst_notebook_dir
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_experiment_name, opt_input_dir, opt_import_source_tags, \
+    opt_use_src_user_id, opt_dst_notebook_dir, opt_import_run_workers, \
+    opt_import_artifact_workers
 from mlflow_export_import.common import utils
 from mlflow_export_import.common import io_utils
-from mlflow_export_import.common import mlflow_utils
-from mlflow_export_import.client.http_client import DatabricksHttpClient
+from mlflow_export_import.common.thread_utils import map_unordered
+from mlflow_export_import.client import http_client
+from mlflow_export_import.client.http_client import get_databricks_http_client
 from mlflow_export_import.run.import_run import RunImporter
 from mlflow_export_import.common.source_tags import set_source_tags_for_field, mk_source_tags_mlflow_tag, fmt_timestamps
 
 
 class ExperimentImporter():
 
-    def __init__(self, mlflow_client, import_source_tags=False, mlmodel_fix=True, use_src_user_id=False):
+    def __init__(self, mlflow_client, import_source_tags=False, mlmodel_fix=True, use_src_user_id=False, run_workers=1, id_map=None,
+            artifact_workers=1):
         """
         :param mlflow_client: MLflow client.
         :param import_source_tags: Import source information for MLFlow objects and create tags in destination object.
         :param use_src_user_id: Set the destination user ID to the source user ID.
                                 Source user ID is ignored when importing into
+        :param run_workers: Number of runs of an experiment to import concurrently.
+        :param id_map: Bulk import ID map. Runs already in the map are skipped and imported runs are added to it.
+        :param artifact_workers: Number of artifact files of a run to upload concurrently.
         """
         self.mlflow_client = mlflow_client
+        self.run_workers = max(1, run_workers or 1)
+        self.id_map = id_map
+        http_client.set_pool_size(self.run_workers * max(1, artifact_workers or 1))
         self.run_importer = RunImporter(self.mlflow_client, 
             import_source_tags=import_source_tags,
             mlmodel_fix=mlmodel_fix,
             use_src_user_id=use_src_user_id,
-            dst_notebook_dir_add_run_id=True)
+            dst_notebook_dir_add_run_id=True,
+            artifact_workers=artifact_workers)
         print("MLflowClient:", self.mlflow_client)
-        self.dbx_client = DatabricksHttpClient()
+        self.dbx_client = get_databricks_http_client()
         self.import_source_tags = import_source_tags
 
 
@@ -48,6 +59,12 @@ class ExperimentImporter():
         info = io_utils.get_info(exp_dct)
         exp_dct = io_utils.get_mlflow(exp_dct)
 
+        src_exp_id = exp_dct["experiment"]["experiment_id"]
+        mapped_runs = self.id_map.get_runs(src_exp_id) if self.id_map else {}
+        if self.id_map and self.id_map.is_experiment_completed(src_exp_id):
+            print(f"Experiment '{exp_name}' was already imported from '{input_dir}'")
+            return { src_run_id: dst_run_info for src_run_id,(dst_run_info,_) in mapped_runs.items() }
+
         tags = exp_dct["experiment"]["tags"] 
         if self.import_source_tags:
             source_tags = mk_source_tags_mlflow_tag(tags)
@@ -56,23 +73,39 @@ class ExperimentImporter():
             set_source_tags_for_field(exp, tags)
             fmt_timestamps("creation_time", exp, tags)
             fmt_timestamps("last_update_time", exp, tags)
-        mlflow_utils.set_experiment(self.mlflow_client, self.dbx_client, exp_name, tags)
+        dst_exp_id = self.run_importer.experiment_resolver.set_experiment(exp_name, tags).experiment_id
+        if self.id_map:
+            self.id_map.add_experiment(src_exp_id, dst_exp_id)
 
         run_ids = exp_dct["runs"]
         failed_run_ids = info["failed_runs"]
 
         print(f"Importing {len(run_ids)} runs into experiment '{exp_name}' from '{input_dir}'")
+        def import_run(src_run_id):
+            dst_run, src_parent_run_id = self.run_importer.import_run(exp_name, os.path.join(input_dir, src_run_id), dst_notebook_dir)
+            return src_run_id, dst_run, src_parent_run_id
+
+        # Maps are only updated in the calling thread
         run_ids_map = {}
         run_info_map = {}
-        for src_run_id in run_ids:
-            dst_run, src_parent_run_id = self.run_importer.import_run(exp_name, os.path.join(input_dir, src_run_id), dst_notebook_dir)
+        for src_run_id,(dst_run_info, src_parent_run_id) in mapped_runs.items():
+            run_ids_map[src_run_id] = { "dst_run_id": dst_run_info.run_id, "src_parent_run_id": src_parent_run_id }
+            run_info_map[src_run_id] = dst_run_info
+        if mapped_runs:
+            print(f"Skipping {len(mapped_runs)} runs already imported into experiment '{exp_name}'")
+        run_ids_to_import = [ run_id for run_id in run_ids if run_id not in mapped_runs ]
+        for src_run_id, dst_run, src_parent_run_id in map_unordered(import_run, run_ids_to_import, self.run_workers):
             dst_run_id = dst_run.info.run_id
             run_ids_map[src_run_id] = { "dst_run_id": dst_run_id, "src_parent_run_id": src_parent_run_id }
             run_info_map[src_run_id] = dst_run.info
+            if self.id_map:
+                self.id_map.add_run(src_run_id, src_exp_id, dst_run.info, src_parent_run_id)
         print(f"Imported {len(run_ids)} runs into experiment '{exp_name}' from '{input_dir}'")
         if len(failed_run_ids) > 0:
             print(f"Warning: {len(failed_run_ids)} failed runs were not imported - see '{path}'")
-        utils.nested_tags(self.mlflow_client, run_ids_map)
+        utils.nested_tags(self.mlflow_client, run_ids_map) # parent run IDs are relinked once all runs are imported
+        if self.id_map:
+            self.id_map.complete_experiment(src_exp_id)
         return run_info_map
 
 
@@ -82,15 +115,21 @@ class ExperimentImporter():
 @opt_import_source_tags
 @opt_use_src_user_id
 @opt_dst_notebook_dir
-def main(input_dir, experiment_name, import_source_tags, use_src_user_id, dst_notebook_dir):
+@opt_import_run_workers
+@opt_import_artifact_workers
+@opt_max_rates
+def main(input_dir, experiment_name, import_source_tags, use_src_user_id, dst_notebook_dir, run_workers, artifact_workers, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     importer = ExperimentImporter(
         client,
         import_source_tags=import_source_tags,
-        use_src_user_id=use_src_user_id)
+        use_src_user_id=use_src_user_id,
+        run_workers=run_workers,
+        artifact_workers=artifact_workers)
     importer.import_experiment(experiment_name, input_dir, dst_notebook_dir)
 
 
@@ -8,31 +8,38 @@ import mlflow
 
 from mlflow_export_import.common import utils
 from mlflow_export_import.common import io_utils
-from mlflow_export_import.common.click_options import opt_model, opt_output_dir, \
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.metadata_cache import MetadataCache
+from mlflow_export_import.common.click_options import opt_max_rates, opt_model, opt_output_dir, \
     opt_notebook_formats, opt_stages, opt_versions, opt_export_latest_versions
 from mlflow_export_import.common import MlflowExportImportException
-from mlflow_export_import.client.http_client import MlflowHttpClient
+from mlflow_export_import.client.http_client import get_mlflow_http_client
 from mlflow_export_import.common import model_utils 
 from mlflow_export_import.run.export_run import RunExporter
 
 
 class ModelExporter():
 
-    def __init__(self,  mlflow_client, notebook_formats=None, stages=None, versions=None, export_run=True, export_latest_versions=False):
+    def __init__(self,  mlflow_client, notebook_formats=None, stages=None, versions=None, export_run=True, export_latest_versions=False,
+            metadata_cache=None, since=None):
         """
         :param mlflow_client: MlflowClient
         :param notebook_formats: List of notebook formats to export. Values are SOURCE, HTML, JUPYTER or DBC.
         :param stages: Stages to export. Default is all stages. Values are Production, Staging, Archived and None.
         :param export_run: Export the run that generated a registered model's version.
         :param export_latest_versions: Export latest registered model versions instead of all versions.
+        :param metadata_cache: MetadataCache shared with other exporters. Default is a cache of this exporter.
+        :param since: Only export versions updated after this timestamp in milliseconds.
         """
-        self.mlflow_client = mlflow_client
-        self.http_client = MlflowHttpClient()
-        self.run_exporter = RunExporter(self.mlflow_client, notebook_formats=notebook_formats)
+        self.mlflow_client = rate_limiter.limit_client(mlflow_client)
+        self.http_client = get_mlflow_http_client()
+        self.metadata_cache = metadata_cache or MetadataCache(self.mlflow_client)
+        self.run_exporter = RunExporter(self.mlflow_client, notebook_formats=notebook_formats, metadata_cache=self.metadata_cache)
         self.export_run = export_run
         self.stages = self._normalize_stages(stages)
         self.versions = versions if versions else []
         self.export_latest_versions = export_latest_versions
+        self.since = since
         if len(self.stages) > 0 and len(self.versions) > 0:
             raise MlflowExportImportException(
                 f"Both stages {self.stages} and versions {self.versions} cannot be set", http_status_code=400)
@@ -61,6 +68,8 @@ class ModelExporter():
                 continue
             if len(self.versions) > 0 and not vr.version in self.versions:
                 continue
+            if self.since is not None and vr.last_updated_timestamp <= self.since:
+                continue
             opath = os.path.join(output_dir, vr.run_id)
             opath = opath.replace("dbfs:", "/dbfs")
             dct = { "version": vr.version, 
@@ -73,10 +82,10 @@ class ModelExporter():
             try:
                 if self.export_run:
                     self.run_exporter.export_run(vr.run_id, opath)
-                run = self.mlflow_client.get_run(vr.run_id)
+                run = self.metadata_cache.get_run(vr.run_id)
                 dct = dict(vr)
                 dct["_run_artifact_uri"] = run.info.artifact_uri
-                experiment = mlflow.get_experiment(run.info.experiment_id)
+                experiment = self.metadata_cache.get_experiment(run.info.experiment_id)
                 dct["_experiment_name"] = experiment.name
                 output_versions.append(dct)
             except mlflow.exceptions.RestException as e:
@@ -133,10 +142,12 @@ class ModelExporter():
 @opt_stages
 @opt_versions
 @opt_export_latest_versions
-def main(model, output_dir, notebook_formats, stages, versions, export_latest_versions):
+@opt_max_rates
+def main(model, output_dir, notebook_formats, stages, versions, export_latest_versions, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     mlflow_client = mlflow.client.MlflowClient()
     versions = versions.split(",") if versions else []
     exporter = ModelExporter(mlflow_client, 
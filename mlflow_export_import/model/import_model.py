@@ -8,12 +8,14 @@ import click
 import mlflow
 from mlflow.exceptions import RestException
 
-from mlflow_export_import.common.click_options import opt_input_dir, opt_model, \
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.click_options import opt_max_rates, opt_input_dir, opt_model, \
     opt_experiment_name, opt_delete_model, opt_import_source_tags, opt_verbose
 from mlflow_export_import.common import io_utils
 from mlflow_export_import.common import model_utils
 from mlflow_export_import.common.source_tags import set_source_tags_for_field, fmt_timestamps
 from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common.iterators import SearchModelVersionsIterator
 from mlflow_export_import.run.import_run import RunImporter
 
 
@@ -46,6 +48,7 @@ class BaseModelImporter():
         :param dst_run: Destination run.
         :param dst_source: Destination version 'source' field.
         :param sleep_time: Seconds to wait for model version crreation.
+        :return: Destination model version.
         """
         dst_source = dst_source.replace("file://","") # OSS MLflow
         if not dst_source.startswith("dbfs:") and not os.path.exists(dst_source):
@@ -67,6 +70,7 @@ class BaseModelImporter():
         print(f"Importing model '{model_name}' version {dst_vr.version} stage '{src_current_stage}'")
         if src_current_stage != "None": # fails for Databricks but no OSS
             self.mlflow_client.transition_model_version_stage(model_name, dst_vr.version, src_current_stage)
+        return dst_vr
 
 
     def _import_model(self, model_name, input_dir, delete_model=False):
@@ -165,15 +169,20 @@ class ModelImporter(BaseModelImporter):
         dst_run = self.mlflow_client.get_run(dst_run_id)
         model_path = _extract_model_path(src_vr["source"], src_vr["run_id"])
         dst_source = f"{dst_run.info.artifact_uri}/{model_path}"
-        self._import_version(model_name, src_vr, dst_run_id, dst_source, sleep_time)
+        return self._import_version(model_name, src_vr, dst_run_id, dst_source, sleep_time)
 
 
 class AllModelImporter(BaseModelImporter):
     """ High-level 'bulk' model importer.  """
 
-    def __init__(self, mlflow_client, run_info_map, run_importer=None, import_source_tags=False, await_creation_for=None):
+    def __init__(self, mlflow_client, run_info_map, run_importer=None, import_source_tags=False, await_creation_for=None, id_map=None):
+        """
+        :param run_info_map: Map of source run ID to destination run info.
+        :param id_map: Bulk import ID map. Versions already in the map are skipped and imported versions are added to it.
+        """
         super().__init__(mlflow_client, run_importer, import_source_tags=import_source_tags, await_creation_for=await_creation_for)
         self.run_info_map = run_info_map
+        self.id_map = id_map
 
 
     def import_model(self, model_name, input_dir, delete_model=False, verbose=False, sleep_time=30):
@@ -185,23 +194,56 @@ class AllModelImporter(BaseModelImporter):
         :param sleep_time: Seconds to wait for model version crreation.
         :return: Model import manifest.
         """
+        if delete_model and self.id_map and self.id_map.has_model_versions(model_name):
+            print(f"Not deleting model '{model_name}' since its import is resumed")
+            delete_model = False
         model_dct = self._import_model(model_name, input_dir, delete_model)
+        unrecorded_versions = self._get_unrecorded_versions(model_name) if self.id_map and self.id_map.resume else {}
         print("Importing versions:")
         for vr in model_dct["versions"]:
+            if self.id_map and self.id_map.get_model_version(model_name, vr["version"]):
+                print(f"Skipping model '{model_name}' version {vr['version']} already imported")
+                continue
             src_run_id = vr["run_id"]
             dst_run_id = self.run_info_map[src_run_id].run_id
-            mlflow.set_experiment(vr["_experiment_name"])
-            self.import_version(model_name, vr, dst_run_id, sleep_time)
+            candidates = unrecorded_versions.get((dst_run_id, self._get_dst_source(vr)))
+            if candidates:
+                dst_vr = candidates.pop(0)
+                print(f"Found model '{model_name}' version {dst_vr.version} created by the interrupted import of version {vr['version']}")
+                if vr["current_stage"] != "None" and dst_vr.current_stage != vr["current_stage"]:
+                    self.mlflow_client.transition_model_version_stage(model_name, dst_vr.version, vr["current_stage"])
+            else:
+                mlflow.set_experiment(vr["_experiment_name"])
+                dst_vr = self.import_version(model_name, vr, dst_run_id, sleep_time)
+            if self.id_map:
+                self.id_map.add_model_version(model_name, vr["version"], dst_vr.version)
         if verbose:
             model_utils.dump_model_versions(self.mlflow_client, model_name)
 
 
-    def import_version(self, model_name, src_vr, dst_run_id, sleep_time):
+    def _get_unrecorded_versions(self, model_name):
+        """
+        Get the versions of a resumed import that were created but not recorded in the ID map
+        before the previous import was interrupted.
+        :return: Dictionary of (run ID, source) to destination versions.
+        """
+        recorded = self.id_map.get_dst_model_versions(model_name)
+        versions = {}
+        for vr in SearchModelVersionsIterator(self.mlflow_client, filter=f"name='{model_name}'"):
+            if str(vr.version) not in recorded:
+                versions.setdefault((vr.run_id, vr.source), []).append(vr)
+        return versions
+
+
+    def _get_dst_source(self, src_vr):
         src_run_id = src_vr["run_id"]
         model_path = _extract_model_path(src_vr["source"], src_run_id) # get path to model artifact
         dst_artifact_uri = self.run_info_map[src_run_id].artifact_uri
-        dst_source = f"{dst_artifact_uri}/{model_path}"
-        self._import_version(model_name, src_vr, dst_run_id, dst_source, sleep_time)
+        return f"{dst_artifact_uri}/{model_path}".replace("file://","")
+
+
+    def import_version(self, model_name, src_vr, dst_run_id, sleep_time):
+        return self._import_version(model_name, src_vr, dst_run_id, self._get_dst_source(src_vr), sleep_time)
 
 
 def _extract_model_path(source, run_id):
@@ -251,10 +293,12 @@ def _path_join(x, y):
     default=5,
 )
 @opt_verbose
-def main(input_dir, model, experiment_name, delete_model, await_creation_for, import_source_tags, verbose, sleep_time):
+@opt_max_rates
+def main(input_dir, model, experiment_name, delete_model, await_creation_for, import_source_tags, verbose, sleep_time, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.client.MlflowClient()
     importer = ModelImporter(client, import_source_tags=import_source_tags, await_creation_for=await_creation_for)
     importer.import_model(model, input_dir, experiment_name, delete_model, verbose, sleep_time)
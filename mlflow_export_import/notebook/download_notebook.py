@@ -3,22 +3,94 @@ Downloads a Databricks notebook with optional revision.
 """
 
 import os
+import shutil
+import threading
 import click
 
 from mlflow_export_import.common.click_options import opt_output_dir
 from mlflow_export_import.common import utils, io_utils
 from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common.thread_utils import map_unordered
 from mlflow_export_import.client.http_client import DatabricksHttpClient
 
 
-def download_notebook(output_dir, notebook_workspace_path, revision_id, notebook_formats, dbx_client):
+class NotebookCache():
+    """
+    Export session cache of downloaded notebooks keyed by notebook path, revision and format.
+    A notebook already downloaded for another run is hard linked (or copied) instead of downloaded again.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._paths = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+
+    def get(self, key, output_path, download):
+        """
+        :param key: Tuple of notebook workspace path, revision ID and format.
+        :param output_path: Local path of the notebook file.
+        :param download: Function of output_path that downloads the notebook and returns whether it succeeded.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self._paths.get(key)
+            if path and os.path.exists(path):
+                _link_or_copy(path, output_path)
+                self._count(hit=True)
+                return True
+            self._count(hit=False)
+            if download(output_path):
+                self._paths[key] = output_path
+                return True
+            return False
+
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+def _link_or_copy(src_path, dst_path):
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
+    try:
+        os.link(src_path, dst_path)
+    except OSError: # e.g. different devices or a filesystem without hard links
+        shutil.copyfile(src_path, dst_path)
+
+
+def download_notebook(output_dir, notebook_workspace_path, revision_id, notebook_formats, dbx_client, cache=None):
+    """
+    Download the formats of a notebook concurrently.
+    :param cache: Optional NotebookCache of the export session.
+    """
     notebook_dir = os.path.join(output_dir)
     os.makedirs(notebook_dir, exist_ok=True)
-    for format in notebook_formats:
-        _download_notebook(notebook_workspace_path, notebook_dir, format, format.lower(), revision_id, dbx_client)
+    notebook_name = os.path.basename(notebook_workspace_path)
 
+    def download_format(format):
+        extension = format.lower()
+        notebook_path = os.path.join(notebook_dir, f"{notebook_name}.{extension}")
+        def download(path):
+            if os.path.exists(path): # may be a hard link to the notebook of another run
+                os.remove(path)
+            return _download_notebook(notebook_workspace_path, path, format, revision_id, dbx_client)
+        if cache is None or not revision_id:
+            return download(notebook_path)
+        return cache.get((notebook_workspace_path, revision_id, format), notebook_path, download)
 
-def _download_notebook(notebook_workspace_path, output_dir, format, extension, revision_id, dbx_client):
+    for _ in map_unordered(download_format, notebook_formats, len(notebook_formats)):
+        pass
+
+
+def _download_notebook(notebook_workspace_path, notebook_path, format, revision_id, dbx_client):
     params = { 
         "path": notebook_workspace_path, 
         "direct_download": True,
@@ -26,13 +98,13 @@ def _download_notebook(notebook_workspace_path, output_dir, format, extension, r
     }
     if revision_id:
         params["revision_timestamp"] = revision_id # NOTE: not documented publicly
-    notebook_name = os.path.basename(notebook_workspace_path)
     try:
         rsp = dbx_client._get("workspace/export", params)
-        notebook_path = os.path.join(output_dir, f"{notebook_name}.{extension}")
         io_utils.write_file(notebook_path, rsp.content)
+        return True
     except MlflowExportImportException as e:
         print(f"WARNING: Cannot download notebook '{notebook_workspace_path}'. {e}")
+        return False
 
 
 @click.command()
@@ -5,16 +5,24 @@ Exports a run to a directory.
 import os
 import json
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 import click
 import mlflow
 
 from mlflow_export_import.common import utils
-from mlflow_export_import.common.click_options import opt_run_id, opt_output_dir, opt_notebook_formats
+from mlflow_export_import.common.click_options import opt_max_rates, opt_run_id, opt_output_dir, opt_notebook_formats, \
+    opt_metric_workers, opt_metrics_format, opt_artifact_workers
 from mlflow_export_import.common import filesystem as _filesystem
 from mlflow_export_import.common import io_utils
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common import artifact_transfer
+from mlflow_export_import.common.artifact_walker import ArtifactWalker
 from mlflow_export_import.common.timestamp_utils import fmt_ts_millis
-from mlflow_export_import.client.http_client import DatabricksHttpClient
-from mlflow_export_import.notebook.download_notebook import download_notebook
+from mlflow_export_import.client import http_client
+from mlflow_export_import.client.http_client import get_databricks_http_client, get_mlflow_http_client
+from mlflow_export_import.run import metric_history
+from mlflow_export_import.run.metric_history import MetricsFormat
+from mlflow_export_import.notebook.download_notebook import download_notebook, NotebookCache
 
 from mlflow.utils.mlflow_tags import MLFLOW_DATABRICKS_NOTEBOOK_PATH
 MLFLOW_DATABRICKS_NOTEBOOK_REVISION_ID = "mlflow.databricks.notebookRevisionID" # NOTE: not in mlflow/utils/mlflow_tags.py
@@ -22,30 +30,75 @@ MLFLOW_DATABRICKS_NOTEBOOK_REVISION_ID = "mlflow.databricks.notebookRevisionID"
 print("MLflow Version:", mlflow.__version__)
 print("MLflow Tracking URI:", mlflow.get_tracking_uri())
 
+def get_pool_size(metric_workers, artifact_workers):
+    """
+    :return: Number of connections used by the export of a run. Metrics and artifacts are exported one after the other.
+    """
+    return max(1, metric_workers or 1, artifact_workers or 1)
+
+
 class RunExporter:
 
-    def __init__(self, mlflow_client, notebook_formats=None):
+    def __init__(self, mlflow_client, notebook_formats=None, metric_workers=1, metrics_format=MetricsFormat.JSON, artifact_workers=1,
+            metadata_cache=None):
         """
         :param mlflow_client: MLflow client.
         :param notebook_formats: List of notebook formats to export. Values are SOURCE, HTML, JUPYTER or DBC.
+        :param metric_workers: Maximum number of metric histories of a run to fetch concurrently.
+        :param metrics_format: Format of metric histories. 'json' writes them inline in run.json.
+                               'jsonl' and 'npy' stream each history page by page to its own sidecar file.
+        :param artifact_workers: Number of artifact files of a run to download concurrently.
+        :param metadata_cache: MetadataCache shared with other exporters. Runs are fetched through it.
         """
         if notebook_formats is None:
             notebook_formats = []
-        self.mlflow_client = mlflow_client
-        self.dbx_client = DatabricksHttpClient()
+        self.mlflow_client = rate_limiter.limit_client(mlflow_client)
+        self.dbx_client = get_databricks_http_client()
         print("Databricks REST client:", self.dbx_client)
         self.notebook_formats = notebook_formats
+        self.metric_workers = max(1, metric_workers or 1)
+        self.artifact_workers = max(1, artifact_workers or 1)
+        http_client.set_pool_size(get_pool_size(self.metric_workers, self.artifact_workers))
+        self.artifact_walker = ArtifactWalker(self.mlflow_client)
+        self.metadata_cache = metadata_cache
+        self.notebook_cache = NotebookCache()
+        self.metrics_format = metric_history.validate_metrics_format(metrics_format)
+        self.http_client = None if metrics_format == MetricsFormat.JSON else get_mlflow_http_client()
+
+
+    def _get_metric_history(self, run_id, metric):
+        metric_history = self.mlflow_client.get_metric_history(run_id, metric)
+        lst = [utils.strip_underscores(m) for m in metric_history]
+        for x in lst:
+            del x["key"] 
+        return lst
 
 
-    def _get_metrics_with_steps(self, run):
-        metrics_with_steps = {}
-        for metric in run.data.metrics.keys():
-            metric_history = self.mlflow_client.get_metric_history(run.info.run_id,metric)
-            lst = [utils.strip_underscores(m) for m in metric_history]
-            for x in lst:
-                del x["key"] 
-            metrics_with_steps[metric] = lst
-        return metrics_with_steps
+    def _export_metric_history(self, run_id, metric, output_dir):
+        pages = metric_history.iter_metric_history(self.http_client, run_id, metric)
+        return metric_history.write_metric_history(output_dir, metric, pages, self.metrics_format)
+
+
+    def _get_metrics_with_steps(self, run, output_dir=None):
+        """
+        Fetch the history of each metric of a run. With more than one worker the histories are fetched
+        concurrently, but results are returned in the run's metric key order so the output is
+        identical to the serial path.
+        For sidecar metrics formats each history is streamed to its file and a pointer is returned instead.
+        """
+        run_id = run.info.run_id
+        if self.metrics_format == MetricsFormat.JSON:
+            get_history = lambda metric: self._get_metric_history(run_id, metric)
+        else:
+            get_history = lambda metric: self._export_metric_history(run_id, metric, output_dir)
+        metrics = list(run.data.metrics.keys())
+        max_workers = min(self.metric_workers, len(metrics))
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                histories = list(executor.map(get_history, metrics))
+        else:
+            histories = [ get_history(metric) for metric in metrics ]
+        return dict(zip(metrics, histories))
 
 
     def export_run(self, run_id, output_dir):
@@ -54,7 +107,22 @@ class RunExporter:
         :param output_dir: Output directory.
         :return: whether export succeeded.
         """
-        run = self.mlflow_client.get_run(run_id)
+        run = self.metadata_cache.get_run(run_id) if self.metadata_cache else self.mlflow_client.get_run(run_id)
+        self.export_run_metadata(run, output_dir)
+        try:
+            self.export_run_artifacts(run, output_dir)
+            self.export_run_notebook(run, output_dir)
+            return True
+        except Exception as e:
+            print("ERROR: run_id:", run.info.run_id, "Exception:", e)
+            traceback.print_exc()
+            return False
+
+
+    def export_run_metadata(self, run, output_dir):
+        """
+        Export the run's info, params, metrics and tags to run.json.
+        """
         tags = run.data.tags
         tags = dict(sorted(tags.items()))
         
@@ -64,31 +132,36 @@ class RunExporter:
         mlflow_attr = {
             "info": info,
             "params": run.data.params,
-            "metrics": self._get_metrics_with_steps(run),
+            "metrics": self._get_metrics_with_steps(run, output_dir),
             "tags": tags
         }
-        io_utils.write_export_file(output_dir, "run.json", __file__, mlflow_attr)
-        fs =  _filesystem.get_filesystem(".")
+        info_attr = metric_history.mk_metrics_info(self.metrics_format) if self.metrics_format != MetricsFormat.JSON else None
+        io_utils.write_export_file(output_dir, "run.json", __file__, mlflow_attr, info_attr)
 
-        # copy artifacts
-        dst_path = os.path.join(output_dir, "artifacts")
-        try:
-            artifacts = self.mlflow_client.list_artifacts(run.info.run_id)
-            if len(artifacts) > 0: # Because of https://github.com/mlflow/mlflow/issues/2839
-                fs.mkdirs(dst_path)
-                self.mlflow_client.download_artifacts(run.info.run_id, "", dst_path=_filesystem.mk_local_path(dst_path))
-            notebook = tags.get(MLFLOW_DATABRICKS_NOTEBOOK_PATH, None)
-            if notebook is not None:
-                if len(self.notebook_formats) > 0:
-                    self._export_notebook(output_dir, notebook, run, fs)
-            elif len(self.notebook_formats) > 0:
-                print(f"WARNING: Cannot export notebook for run '{run_id}' since tag '{MLFLOW_DATABRICKS_NOTEBOOK_PATH}' is not set.")
-            return True
 
-        except Exception as e:
-            print("ERROR: run_id:", run.info.run_id, "Exception:", e)
-            traceback.print_exc()
-            return False
+    def export_run_artifacts(self, run, output_dir):
+        """
+        Download the run's artifacts to the 'artifacts' directory.
+        Files already downloaded by an interrupted export are skipped.
+        """
+        dst_path = _filesystem.mk_local_path(os.path.join(output_dir, "artifacts"))
+        num_downloaded, num_skipped = artifact_transfer.download_artifacts(self.mlflow_client, run.info.run_id, dst_path,
+            self.artifact_workers, self.artifact_walker)
+        if num_skipped > 0:
+            print(f"Skipped {num_skipped} artifact files of run '{run.info.run_id}' already downloaded")
+
+
+    def export_run_notebook(self, run, output_dir):
+        """
+        Download the run's Databricks notebook in the requested formats.
+        """
+        if len(self.notebook_formats) == 0:
+            return
+        notebook = run.data.tags.get(MLFLOW_DATABRICKS_NOTEBOOK_PATH, None)
+        if notebook is not None:
+            self._export_notebook(output_dir, notebook, run, _filesystem.get_filesystem("."))
+        else:
+            print(f"WARNING: Cannot export notebook for run '{run.info.run_id}' since tag '{MLFLOW_DATABRICKS_NOTEBOOK_PATH}' is not set.")
 
 
     def _export_notebook(self, output_dir, notebook, run, fs):
@@ -105,21 +178,29 @@ class RunExporter:
         }
         path = os.path.join(notebook_dir, "manifest.json")
         fs.write(path, (json.dumps(manifest, indent=2)+"\n"))
-        download_notebook(notebook_dir, notebook, revision_id, self.notebook_formats, self.dbx_client)
+        download_notebook(notebook_dir, notebook, revision_id, self.notebook_formats, self.dbx_client, self.notebook_cache)
 
 
 @click.command()
 @opt_run_id
 @opt_output_dir
 @opt_notebook_formats
-def main(run_id, output_dir, notebook_formats):
+@opt_metric_workers
+@opt_metrics_format
+@opt_artifact_workers
+@opt_max_rates
+def main(run_id, output_dir, notebook_formats, metric_workers, metrics_format, artifact_workers, max_rates):
     print("Options:")
     for k,v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     exporter = RunExporter(
       client,
-      notebook_formats=utils.string_to_list(notebook_formats))
+      notebook_formats=utils.string_to_list(notebook_formats),
+      metric_workers=metric_workers,
+      metrics_format=metrics_format,
+      artifact_workers=artifact_workers)
     exporter.export_run(run_id, output_dir)
 
 
@@ -6,6 +6,7 @@ import os
 import tempfile
 import click
 import base64
+import hashlib
 
 import mlflow
 from mlflow.entities import RunStatus
@@ -15,23 +16,31 @@ from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
 from mlflow_export_import.common import utils
 
 from mlflow_export_import.common.click_options import (
+    opt_max_rates,
     opt_input_dir,
     opt_import_source_tags,
     opt_experiment_name,
     opt_use_src_user_id,
     opt_dst_notebook_dir,
+    opt_import_artifact_workers,
 )
 
 from mlflow_export_import.common.filesystem import mk_local_path
-from mlflow_export_import.common.find_artifacts import find_artifacts
-from mlflow_export_import.client.http_client import DatabricksHttpClient
+from mlflow_export_import.client import http_client
+from mlflow_export_import.client.http_client import get_databricks_http_client
 from mlflow_export_import.common import mlflow_utils
 from mlflow_export_import.common import io_utils
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common import artifact_transfer
+from mlflow_export_import.common.metadata_cache import LruCache
 from mlflow_export_import.common import filesystem as _filesystem
 from mlflow_export_import.common import MlflowExportImportException
 from mlflow_export_import.run import run_data_importer
 
 
+MAX_ENCODED_NOTEBOOKS = 100
+
+
 class RunImporter:
     def __init__(
         self,
@@ -40,26 +49,33 @@ class RunImporter:
         mlmodel_fix=True,
         use_src_user_id=False,
         dst_notebook_dir_add_run_id=False,
+        artifact_workers=1,
     ):
         """
         :param mlflow_client: MLflow client.
         :param import_source_tags: Import source information for MLFlow objects and create tags in destination object.
         :param mlmodel_fix: Add correct run ID in destination MLmodel artifact.
-                            Can be expensive for deeply nested artifacts.
+                            MLmodel files are patched in a staging directory before the upload.
         :param use_src_user_id: Set the destination user ID to the source user ID.
                                 Source user ID is ignored when importing into
                                 Databricks since setting it is not allowed.
         :param dst_notebook_dir: Databricks destination workspace directory for notebook import.
         :param dst_notebook_dir_add_run_id: Add the run ID to the destination notebook directory.
+        :param artifact_workers: Number of artifact files of a run to upload concurrently.
         """
 
-        self.mlflow_client = mlflow_client
+        self.mlflow_client = rate_limiter.limit_client(mlflow_client)
         self.mlmodel_fix = mlmodel_fix
         self.use_src_user_id = use_src_user_id
         self.in_databricks = "DATABRICKS_RUNTIME_VERSION" in os.environ
         self.dst_notebook_dir_add_run_id = dst_notebook_dir_add_run_id
-        self.dbx_client = DatabricksHttpClient()
+        self.dbx_client = get_databricks_http_client()
+        self.experiment_resolver = mlflow_utils.ExperimentResolver(self.mlflow_client, self.dbx_client)
+        self._uploaded_notebooks = {} # destination notebook path to content hash of the notebook uploaded in this session
+        self._encoded_notebooks = LruCache(MAX_ENCODED_NOTEBOOKS) # content hash to base64 content
         self.import_source_tags = import_source_tags
+        self.artifact_workers = max(1, artifact_workers or 1)
+        http_client.set_pool_size(self.artifact_workers)
         print(f"in_databricks: {self.in_databricks}")
         print(f"importing_into_databricks: {utils.importing_into_databricks()}")
 
@@ -77,8 +93,7 @@ class RunImporter:
         return res
 
     def _import_run(self, dst_exp_name, input_dir, dst_notebook_dir):
-        exp_id = mlflow_utils.set_experiment(self.mlflow_client, self.dbx_client, dst_exp_name)
-        exp = self.mlflow_client.get_experiment(exp_id)
+        exp = self.experiment_resolver.set_experiment(dst_exp_name)
         src_run_path = os.path.join(input_dir, "run.json")
         src_run_dct = io_utils.read_file_mlflow(src_run_path)
 
@@ -87,9 +102,7 @@ class RunImporter:
             run = self.mlflow_client.get_run(run_id)
             path = os.path.join(input_dir, "artifacts")
             if os.path.exists(_filesystem.mk_local_path(path)):
-                self.mlflow_client.log_artifacts(run_id, mk_local_path(path))
-            if self.mlmodel_fix:
-                self._update_mlmodel_run_id(run_id)
+                self._upload_artifacts(run, mk_local_path(path))
             self.mlflow_client.set_terminated(run_id, RunStatus.to_string(RunStatus.FINISHED))
             run = self.mlflow_client.get_run(run_id)
         except Exception as e:
@@ -104,27 +117,33 @@ class RunImporter:
 
         return (run, src_run_dct["tags"].get(MLFLOW_PARENT_RUN_ID, None))
 
-    def _update_mlmodel_run_id(self, run_id):
+    def _upload_artifacts(self, run, path):
+        with tempfile.TemporaryDirectory() as staging_dir:
+            overlay = self._stage_mlmodel_files(run.info.run_id, path, staging_dir) if self.mlmodel_fix else None
+            num_files, num_bytes, duration = artifact_transfer.upload_artifacts(run.info.artifact_uri, path, self.artifact_workers, overlay)
+        mb = num_bytes / (1024 * 1024)
+        rate = round(mb / duration, 2) if duration > 0 else 0
+        print(f"Uploaded {num_files} artifact files ({round(mb,2)} MB) of run '{run.info.run_id}' in {round(duration,1)} seconds ({rate} MB/s)")
+
+    def _stage_mlmodel_files(self, run_id, path, staging_dir):
         """
         Workaround to fix the run_id in the destination MLmodel file since there is no method to get all model artifacts of a run.
 
         Since an MLflow run does not keeps track of its models, there is no method to retrieve the artifact path to all its models.
-        This workaround recursively searches the run's root artifact directory for all MLmodel files, and assumes their directory
-        represents a path to the model.
+        This workaround searches the run's local exported artifact directory for all MLmodel files, and assumes their directory
+        represents a path to the model. The patched MLmodel files are written to a staging directory so the exported files
+        are not modified.
+        :return: Dictionary of exported MLmodel path to staged MLmodel path.
         """
-
-        mlmodel_paths = find_artifacts(run_id, "", "MLmodel")
-        for mlmodel_path in mlmodel_paths:
-            model_path = mlmodel_path.replace("/MLmodel", "")
-            local_path = self.mlflow_client.download_artifacts(run_id, mlmodel_path)
-            mlmodel = io_utils.read_file(local_path, "yaml")
+        overlay = {}
+        for idx, mlmodel_path in enumerate(artifact_transfer.find_local_files(path, "MLmodel")):
+            mlmodel = io_utils.read_file(mlmodel_path, "yaml")
             mlmodel["run_id"] = run_id
-            with tempfile.TemporaryDirectory() as dir:
-                output_path = os.path.join(dir, "MLmodel")
-                io_utils.write_file(output_path, mlmodel, "yaml")
-                if model_path == "MLmodel":
-                    model_path = ""
-                self.mlflow_client.log_artifact(run_id, output_path, model_path)
+            output_path = os.path.join(staging_dir, str(idx), "MLmodel")
+            os.makedirs(os.path.dirname(output_path))
+            io_utils.write_file(output_path, mlmodel, "yaml")
+            overlay[mlmodel_path] = output_path
+        return overlay
 
     def _upload_databricks_notebook(self, input_dir, src_run_dct, dst_notebook_dir):
         run_id = src_run_dct["info"]["run_id"]
@@ -141,10 +160,14 @@ class RunImporter:
             print(f"WARNING: Source '{notebook_path}' does not exist for run_id '{run_id}'")
             return
 
-        with open(notebook_path, "r", encoding="utf-8") as f:
+        with open(notebook_path, "rb") as f:
             content = f.read()
         dst_notebook_path = os.path.join(dst_notebook_dir, notebook_name)
-        content = base64.b64encode(content.encode()).decode("utf-8")
+        content_hash = hashlib.sha256(content).hexdigest()
+        if self._uploaded_notebooks.get(dst_notebook_path) == content_hash:
+            print(f"Notebook '{dst_notebook_path}' for run {run_id} was already imported")
+            return
+        content = self._encoded_notebooks.get(content_hash, lambda _: base64.b64encode(content).decode("utf-8"))
         data = {
             "path": dst_notebook_path,
             "language": "PYTHON",
@@ -152,10 +175,11 @@ class RunImporter:
             "overwrite": True,
             "content": content,
         }
-        mlflow_utils.create_workspace_dir(self.dbx_client, dst_notebook_dir)
+        self.experiment_resolver.create_workspace_dir(dst_notebook_dir)
         try:
             print(f"Importing notebook '{dst_notebook_path}' for run {run_id}")
             self.dbx_client._post("workspace/import", data)
+            self._uploaded_notebooks[dst_notebook_path] = content_hash
         except MlflowExportImportException as e:
             print(f"WARNING: Cannot save notebook '{dst_notebook_path}'. {e}")
 
@@ -168,7 +192,7 @@ class RunImporter:
 @opt_dst_notebook_dir
 @click.option(
     "--mlmodel-fix",
-    help="Add correct run ID in destination MLmodel artifact. Can be expensive for deeply nested artifacts.",
+    help="Add correct run ID in destination MLmodel artifact.",
     type=bool,
     default=True,
     show_default=True,
@@ -180,6 +204,8 @@ class RunImporter:
     required=False,
     show_default=True,
 )
+@opt_import_artifact_workers
+@opt_max_rates
 def main(
     input_dir,
     experiment_name,
@@ -188,10 +214,13 @@ def main(
     use_src_user_id,
     dst_notebook_dir,
     dst_notebook_dir_add_run_id,
+    artifact_workers,
+    max_rates,
 ):
     print("Options:")
     for k, v in locals().items():
         print(f"  {k}: {v}")
+    rate_limiter.configure_max_rates(max_rates)
     client = mlflow.tracking.MlflowClient()
     importer = RunImporter(
         client,
@@ -199,6 +228,7 @@ def main(
         mlmodel_fix=mlmodel_fix,
         use_src_user_id=use_src_user_id,
         dst_notebook_dir_add_run_id=dst_notebook_dir_add_run_id,
+        artifact_workers=artifact_workers,
     )
     importer.import_run(experiment_name, input_dir, dst_notebook_dir)
 
@@ -0,0 +1,156 @@
+"""
+Export and import of metric histories stored outside of run.json.
+
+With the 'json' metrics format (default) each metric's history is a list of steps inline in run.json.
+With the 'jsonl' and 'npy' formats each metric's history is fetched page by page and streamed to its own
+sidecar file under the run's 'metrics' directory, and run.json only holds a pointer to the file.
+The 'npy' format stores a history as a NumPy structured array of typed 'value', 'timestamp' and 'step' columns.
+"""
+
+import os
+import json
+import numpy as np
+
+from mlflow_export_import.common import MlflowExportImportException
+from mlflow_export_import.common import filesystem as _filesystem
+
+METRICS_DIR = "metrics"
+MAX_RESULTS = 25000 # Page size for 'metrics/get-history'
+METRICS_FORMAT_VERSION = 1
+NPY_DTYPE = np.dtype([ ("value", "<f8"), ("timestamp", "<i8"), ("step", "<i8") ])
+_NPY_CHUNK_SIZE = 1000000
+
+
+class MetricsFormat:
+    """ Export formats for metric histories. """
+    JSON = "json"
+    JSONL = "jsonl"
+    NPY = "npy"
+    ALL = [ JSON, JSONL, NPY ]
+
+
+def validate_metrics_format(metrics_format):
+    if metrics_format not in MetricsFormat.ALL:
+        raise MlflowExportImportException(
+            f"Metrics format '{metrics_format}' must be one of {MetricsFormat.ALL}", http_status_code=400)
+    return metrics_format
+
+
+def iter_metric_history(http_client, run_id, metric_key, max_results=MAX_RESULTS):
+    """
+    Iterate over the pages of a metric's history with the 'metrics/get-history' REST endpoint.
+    :param http_client: MlflowHttpClient.
+    :return: Generator of lists of steps with 'value', 'timestamp' and 'step' keys.
+    """
+    params = { "run_id": run_id, "metric_key": metric_key, "max_results": max_results }
+    while True:
+        rsp = http_client.get("metrics/get-history", params)
+        yield [ _mk_step(m) for m in rsp.get("metrics", []) ]
+        token = rsp.get("next_page_token")
+        if not token:
+            break
+        params["page_token"] = token
+
+
+def _mk_step(metric):
+    # NOTE: proto3 JSON omits fields with default values, e.g. step 0
+    return {
+        "value": float(metric.get("value", 0.0)),
+        "timestamp": int(metric.get("timestamp", 0)),
+        "step": int(metric.get("step", 0))
+    }
+
+
+def mk_metric_path(metric_key, metrics_format):
+    return os.path.join(METRICS_DIR, f"{metric_key}.{metrics_format}")
+
+
+def mk_metrics_info(metrics_format):
+    """ Return the run.json 'info' stanza for a sidecar metrics format. """
+    return { "metrics_format": metrics_format, "metrics_format_version": METRICS_FORMAT_VERSION }
+
+
+def write_metric_history(output_dir, metric_key, pages, metrics_format=MetricsFormat.JSONL):
+    """
+    Stream the pages of a metric's history to its sidecar file.
+    :return: Pointer to the sidecar file to be stored in run.json.
+    """
+    path = mk_metric_path(metric_key, metrics_format)
+    abs_path = os.path.join(_filesystem.mk_local_path(output_dir), path)
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    if metrics_format == MetricsFormat.NPY:
+        num_steps = _write_npy(abs_path, pages)
+    else:
+        num_steps = _write_jsonl(abs_path, pages)
+    return { "format": metrics_format, "path": path, "num_steps": num_steps }
+
+
+def _write_jsonl(path, pages):
+    num_steps = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for page in pages:
+            for step in page:
+                f.write(json.dumps(step, separators=(",",":"))+"\n")
+            num_steps += len(page)
+    return num_steps
+
+
+def _write_npy(path, pages):
+    """
+    Since the .npy header holds the array length, pages are first appended to a raw file
+    which is then copied in chunks into a memory-mapped .npy file.
+    """
+    raw_path = f"{path}.tmp"
+    num_steps = 0
+    with open(raw_path, "wb") as f:
+        for page in pages:
+            arr = np.array([ (x["value"], x["timestamp"], x["step"]) for x in page ], dtype=NPY_DTYPE)
+            arr.tofile(f)
+            num_steps += len(arr)
+    if num_steps == 0:
+        np.save(path, np.empty(0, dtype=NPY_DTYPE))
+    else:
+        src = np.memmap(raw_path, dtype=NPY_DTYPE, mode="r")
+        dst = np.lib.format.open_memmap(path, mode="w+", dtype=NPY_DTYPE, shape=(num_steps,))
+        for start in range(0, num_steps, _NPY_CHUNK_SIZE):
+            dst[start:start+_NPY_CHUNK_SIZE] = src[start:start+_NPY_CHUNK_SIZE]
+        dst.flush()
+        del src, dst
+    os.remove(raw_path)
+    return num_steps
+
+
+def is_metric_pointer(steps):
+    return isinstance(steps, dict)
+
+
+def iter_metric_steps(input_dir, steps):
+    """
+    Iterate over a metric's history from either inline run.json steps or a sidecar file pointer.
+    :return: Generator of (value, timestamp, step) tuples.
+    """
+    if not is_metric_pointer(steps):
+        for x in steps:
+            yield (x["value"], x["timestamp"], x["step"])
+        return
+    path = os.path.join(_filesystem.mk_local_path(input_dir), steps["path"])
+    if steps["format"] == MetricsFormat.NPY:
+        if steps["num_steps"] == 0:
+            return
+        arr = np.load(path, mmap_mode="r")
+        for start in range(0, len(arr), _NPY_CHUNK_SIZE):
+            yield from arr[start:start+_NPY_CHUNK_SIZE].tolist()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                x = json.loads(line)
+                yield (x["value"], x["timestamp"], x["step"])
+
+
+def read_metric_history(input_dir, steps):
+    """
+    Read a metric's history from either inline run.json steps or a sidecar file pointer.
+    :return: Generator of steps with 'value', 'timestamp' and 'step' keys.
+    """
+    for value, timestamp, step in iter_metric_steps(input_dir, steps):
+        yield { "value": value, "timestamp": timestamp, "step": step }
@@ -2,52 +2,97 @@
 Module to account for importing MLflow run data (params, metrics and tags) 
 Focus is on data that exceed API limits.
 See: https://www.mlflow.org/docs/latest/rest-api.html#request-limits.
+
+With max_in_flight greater than one, up to that many log_batch requests of a run are sent concurrently.
 """
 
 import mlflow
-import math 
+from itertools import islice
 from mlflow.entities import Metric, Param, RunTag
 from mlflow_export_import.common import utils
+from mlflow_export_import.common.retry_utils import call_with_backoff
+from mlflow_export_import.common.thread_utils import map_unordered
 from mlflow_export_import.common.source_tags import ExportTags
 from mlflow_export_import.common.source_tags import mk_source_tags_mlflow_tag, mk_source_tags
+from mlflow_export_import.run import metric_history
+
+
+def iter_batches(data, batch_size):
+    """
+    Lazily chunk an iterable into lists of at most batch_size items.
+    Only the items of the current batch are materialized.
+    """
+    it = iter(data)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
 
+def _log_data(run_dct, run_id, batch_size, get_data, log_data, args_get_data=None, max_in_flight=1):
+    """
+    :param get_data: Function returning an iterable (preferably a generator) of MLflow entities.
+    :param max_in_flight: Maximum number of concurrent log_data calls.
+    """
+    batches = iter_batches(get_data(run_dct, args_get_data), batch_size)
+    for _ in map_unordered(lambda batch: log_data(run_id, batch), batches, max_in_flight, max_in_flight):
+        pass
 
-def _log_data(run_dct, run_id, batch_size, get_data, log_data, args_get_data=None):
-    metadata = get_data(run_dct, args_get_data)
-    num_batches = int(math.ceil(len(metadata) / batch_size))
-    res = []
-    for j in range(0,num_batches):
-        start = j * batch_size 
-        end = start + batch_size
-        batch = metadata[start:end]
-        log_data(run_id, batch)
-        res = res + batch
-    
 
-def log_params(client, run_dct, run_id, batch_size):
+def _log_batch(client, run_id, **kwargs):
+    call_with_backoff(client.log_batch, run_id, **kwargs)
+
+
+def log_params(client, run_dct, run_id, batch_size, max_in_flight=1):
     def get_data(run_dct, args):
-        return [ Param(k,v) for k,v in run_dct["params"].items() ]
+        return ( Param(k,v) for k,v in run_dct["params"].items() )
     def log_data(run_id, params):
-        client.log_batch(run_id, params=params)
-    _log_data(run_dct, run_id, batch_size, get_data, log_data)
+        _log_batch(client, run_id, params=params)
+    _log_data(run_dct, run_id, batch_size, get_data, log_data, max_in_flight=max_in_flight)
 
 
-def log_metrics(client, run_dct, run_id, batch_size):
+def log_metrics(client, run_dct, run_id, batch_size, input_dir=None, max_in_flight=1):
+    """
+    :param input_dir: Run input directory. Needed when metric histories are stored in sidecar files.
+    :param max_in_flight: Maximum number of concurrent log_batch requests. When greater than one, 
+                          the latest step of each metric is held back and only sent once all other 
+                          batches have completed, so the metric's latest value is not overwritten 
+                          by an out-of-order batch.
+    """
+    latest_metrics = []
 
     def get_data(run_dct, args=None):
-        metrics = []
         for metric,steps in  run_dct["metrics"].items():
-            for step in steps:
-                metrics.append(Metric(metric,step["value"],step["timestamp"],step["step"]))
-        return metrics
+            for value,timestamp,step in metric_history.iter_metric_steps(input_dir, steps):
+                yield Metric(metric,value,timestamp,step)
+
+    def get_data_without_latest(run_dct, args=None):
+        for metric,steps in  run_dct["metrics"].items():
+            latest = None
+            for value,timestamp,step in metric_history.iter_metric_steps(input_dir, steps):
+                current = (step, timestamp, value)
+                if latest is None:
+                    latest = current
+                elif current > latest:
+                    yield Metric(metric, latest[2], latest[1], latest[0])
+                    latest = current
+                else:
+                    yield Metric(metric, value, timestamp, step)
+            if latest is not None:
+                latest_metrics.append(Metric(metric, latest[2], latest[1], latest[0]))
 
     def log_data(run_id, metrics):
-        client.log_batch(run_id, metrics=metrics)
+        _log_batch(client, run_id, metrics=metrics)
 
-    _log_data(run_dct, run_id, batch_size, get_data, log_data)
+    if max_in_flight <= 1:
+        _log_data(run_dct, run_id, batch_size, get_data, log_data)
+    else:
+        _log_data(run_dct, run_id, batch_size, get_data_without_latest, log_data, max_in_flight=max_in_flight)
+        _log_data(run_dct, run_id, batch_size, lambda run_dct, args: latest_metrics, log_data, max_in_flight=max_in_flight)
 
 
-def log_tags(client, run_dct, run_id, batch_size, import_source_tags, in_databricks, src_user_id, use_src_user_id):
+def log_tags(client, run_dct, run_id, batch_size, import_source_tags, in_databricks, src_user_id, use_src_user_id, max_in_flight=1):
 
     def get_data(run_dct, args):
         tags = run_dct["tags"]
@@ -57,13 +102,15 @@ def log_tags(client, run_dct, run_id, batch_size, import_source_tags, in_databri
             source_info_tags = mk_source_tags(info, f"{ExportTags.PREFIX_RUN_INFO}")
             tags = { **tags, **source_mlflow_tags, **source_info_tags }
         tags = utils.create_mlflow_tags_for_databricks_import(tags) # remove "mlflow" tags that cannot be imported into Databricks
-        tags = [ RunTag(k,v) for k,v in tags.items() ]
+        for k,v in tags.items():
+            yield RunTag(k,v)
         if not in_databricks:
-            utils.set_dst_user_id(tags, args["src_user_id"], args["use_src_user_id"])
-        return tags
+            user_tags = []
+            utils.set_dst_user_id(user_tags, args["src_user_id"], args["use_src_user_id"])
+            yield from user_tags
 
     def log_data(run_id, tags):
-        client.log_batch(run_id, tags=tags)
+        _log_batch(client, run_id, tags=tags)
 
     args_get = {
         "in_databricks": in_databricks, 
@@ -71,7 +118,7 @@ def log_tags(client, run_dct, run_id, batch_size, import_source_tags, in_databri
         "use_src_user_id": use_src_user_id
     }
 
-    _log_data(run_dct, run_id, batch_size, get_data, log_data, args_get)
+    _log_data(run_dct, run_id, batch_size, get_data, log_data, args_get, max_in_flight)
 
 
 if __name__ == "__main__":
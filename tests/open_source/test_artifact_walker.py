@@ -0,0 +1,40 @@
+from mlflow.entities import FileInfo
+from mlflow_export_import.common.artifact_walker import ArtifactWalker
+
+
+class _TreeClient():
+    """ Artifact tree of a run with a call count of list_artifacts. """
+    tree = {
+        "": [ FileInfo("a", True, None), FileInfo("f1", False, 10) ],
+        "a": [ FileInfo("a/b", True, None), FileInfo("a/MLmodel", False, 20) ],
+        "a/b": [ FileInfo("a/b/MLmodel", False, 30) ]
+    }
+    def __init__(self):
+        self.num_calls = 0
+
+    def list_artifacts(self, run_id, path):
+        self.num_calls += 1
+        return self.tree[path or ""]
+
+
+def test_walk_breadth_first():
+    walker = ArtifactWalker(_TreeClient(), max_workers=4)
+    assert [ (info.path, level) for info,level in walker.walk("123") ] == \
+        [ ("a",0), ("f1",0), ("a/b",1), ("a/MLmodel",1), ("a/b/MLmodel",2) ]
+    assert [ info.path for info,_ in walker.walk("123", max_level=1) ] == [ "a", "f1" ]
+    assert [ info.path for info in walker.list_files("123", "a") ] == [ "a/MLmodel", "a/b/MLmodel" ]
+
+
+def test_summary():
+    assert ArtifactWalker(_TreeClient()).get_summary("123") == (60, 3)
+
+
+def test_memoize():
+    client = _TreeClient()
+    walker = ArtifactWalker(client, memoize=True)
+    walker.get_summary("123")
+    walker.get_summary("123")
+    assert client.num_calls == 3
+    walker.forget("123")
+    walker.get_summary("123")
+    assert client.num_calls == 6
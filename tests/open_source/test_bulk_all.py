@@ -11,11 +11,11 @@ num_models = 2
 num_runs = 3
 
 
-def _run_test(mlflow_context, compare_func, use_threads=False):
+def _run_test(mlflow_context, compare_func, use_threads=False, use_pipeline=False):
     delete_experiments_and_models(mlflow_context)
     for _ in range(0,num_models):
         create_model(mlflow_context.client_src) 
-    export_all(mlflow_context.output_dir, notebook_formats=notebook_formats, use_threads=use_threads)
+    export_all(mlflow_context.output_dir, notebook_formats=notebook_formats, use_threads=use_threads, use_pipeline=use_pipeline)
     import_all(mlflow_context.client_dst, mlflow_context.output_dir, delete_model=True)
     compare_experiments(mlflow_context, compare_func)
     compare_models_with_versions(mlflow_context, compare_func)
@@ -26,8 +26,71 @@ def test_basic(mlflow_context):
 def test_exp_basic_threads(mlflow_context):
     _run_test(mlflow_context, compare_runs, use_threads=True)
 
+def test_exp_basic_pipeline(mlflow_context):
+    _run_test(mlflow_context, compare_runs, use_pipeline=True)
+
 #def test_exp_with_source_tags(mlflow_context): # TODO
     #_run_test(mlflow_context, compare_runs, export_source_tags=True)
 
 #def test_exp_with_source_tags_threads(mlflow_context): # TODO
     #_run_test(mlflow_context, compare_runs, export_source_tags=True, use_threads=True)
+
+
+# == Pipeline failure reporting tests
+
+import os
+from mlflow_export_import.common import io_utils
+from mlflow_export_import.bulk import export_all_pipeline
+from mlflow_export_import.bulk.export_all_pipeline import ExportAllPipeline
+from oss_utils_test import create_experiment, create_simple_run
+
+def test_pipeline_failures(mlflow_context, monkeypatch):
+    delete_experiments_and_models(mlflow_context)
+    create_model(mlflow_context.client_src)
+    exp = create_experiment(mlflow_context.client_src)
+    create_simple_run(mlflow_context.client_src)
+
+    def search_runs(*args, **kwargs):
+        raise Exception("Listing failed")
+    def export_model(*args, **kwargs):
+        raise Exception("Export failed")
+    monkeypatch.setattr(export_all_pipeline, "SearchRunsIterator", search_runs)
+    pipeline = ExportAllPipeline(mlflow_context.client_src)
+    monkeypatch.setattr(pipeline.model_exporter, "export_model", export_model)
+    res_exps, res_models = pipeline.export_all(mlflow_context.output_dir)
+
+    assert res_models["num_failed_models"] == 1
+    assert exp.experiment_id in res_exps["failed_experiments"]
+    dct = io_utils.read_file_mlflow(os.path.join(mlflow_context.output_dir, "experiments", "experiments.json"))
+    results = { res["id"]: res for res in dct["experiments"] }
+    assert results[exp.experiment_id]["status"] == "failed"
+    assert os.path.exists(os.path.join(mlflow_context.output_dir, "experiments", exp.experiment_id, "experiment.json"))
+
+
+# == Incremental export_all tests
+
+from mlflow_export_import.bulk import export_state
+
+def test_export_all_incremental(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    client = mlflow_context.client_src
+    model_name = create_model(client)
+    export_all(mlflow_context.output_dir, incremental=True)
+    since = export_state.read_high_water_mark(mlflow_context.output_dir)
+    assert since is not None
+
+    versions = client.search_model_versions(f"name='{model_name}'")
+    exp_id = client.get_run(versions[0].run_id).info.experiment_id
+    run = client.create_run(exp_id)
+    client.set_terminated(run.info.run_id)
+    client.create_model_version(model_name, f"{run.info.artifact_uri}/model", run.info.run_id)
+    export_all(mlflow_context.output_dir, incremental=True)
+
+    assert export_state.read_high_water_mark(mlflow_context.output_dir) > since
+    manifest = io_utils.read_file(os.path.join(mlflow_context.output_dir, "manifest.json"))
+    assert io_utils.get_info(manifest)["since"] == since
+    dct = io_utils.read_file_mlflow(os.path.join(mlflow_context.output_dir, "experiments", exp_id, "experiment.json"))
+    assert len(dct["runs"]) == len(versions) + 1
+    dct = io_utils.read_file(os.path.join(mlflow_context.output_dir, "models", model_name, "model.json"))
+    assert io_utils.get_info(dct)["num_src_versions"] == 1
+    assert len(io_utils.get_mlflow(dct)["registered_model"]["versions"]) == len(versions) + 1
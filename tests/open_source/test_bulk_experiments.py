@@ -1,4 +1,5 @@
 import os
+import json
 import mlflow
 from mlflow_export_import.bulk import bulk_utils
 from oss_utils_test import create_experiment, mk_uuid, delete_experiments_and_models, mk_test_object_name_default
@@ -101,3 +102,136 @@ def test_get_experiment_ids_from_list(mlflow_context):
     exp_ids1 = ["exp1","exp2","exp3"]
     exp_ids2 = bulk_utils.get_experiment_ids(mlflow_context.client_src, exp_ids1)
     assert exp_ids1 == exp_ids2
+
+
+# == Incremental export tests
+
+from mlflow_export_import.common import io_utils
+from mlflow_export_import.bulk import export_state
+
+def test_exp_incremental(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    exps = [ create_test_experiment(mlflow_context.client_src, 2), create_test_experiment(mlflow_context.client_src, 2) ]
+    exp_names = [ exp.name for exp in exps ]
+    since = export_state.now_millis()
+    export_experiments(mlflow_context.client_src, exp_names, mlflow_context.output_dir)
+
+    mlflow.set_experiment(exps[0].name)
+    _create_simple_run(2)
+    res = export_experiments(mlflow_context.client_src, exp_names, mlflow_context.output_dir, since=since)
+    assert res["experiments"] == 1
+    assert res["total_runs"] == 1
+
+    dct = io_utils.read_file_mlflow(os.path.join(mlflow_context.output_dir, "experiments.json"))
+    assert sorted(x["id"] for x in dct["experiments"]) == sorted(exp.experiment_id for exp in exps)
+    for exp, num_runs in zip(exps, [3, 2]):
+        dct = io_utils.read_file_mlflow(os.path.join(mlflow_context.output_dir, exp.experiment_id, "experiment.json"))
+        assert len(dct["runs"]) == num_runs
+
+
+def test_resolve_experiments(mlflow_context, monkeypatch):
+    delete_experiments_and_models(mlflow_context)
+    exps = [ create_test_experiment(mlflow_context.client_src, 1), create_test_experiment(mlflow_context.client_src, 1) ]
+    selection = [ exps[0].name, exps[1].experiment_id ]
+    expected = [ exp.experiment_id for exp in exps ]
+    assert [ exp.experiment_id for exp in export_state.resolve_experiments(mlflow_context.client_src, selection) ] == expected
+    monkeypatch.setattr(export_state, "LISTING_MIN_EXPERIMENTS", 1)
+    assert [ exp.experiment_id for exp in export_state.resolve_experiments(mlflow_context.client_src, selection) ] == expected
+    run_ids = export_state.get_updated_run_ids(mlflow_context.client_src, expected, 0)
+    assert sorted(run_ids.keys()) == sorted(expected)
+
+
+# == Resume export tests
+
+import shutil
+from mlflow_export_import.bulk.export_journal import JOURNAL_FILE
+
+def test_exp_resume(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    exps = [ create_test_experiment(mlflow_context.client_src, 2), create_test_experiment(mlflow_context.client_src, 2) ]
+    exp_names = [ exp.name for exp in exps ]
+    export_experiments(mlflow_context.client_src, exp_names, mlflow_context.output_dir)
+
+    # Simulate a crash after two runs were exported
+    path = os.path.join(mlflow_context.output_dir, JOURNAL_FILE)
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 4
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines[:2] + [ '{"type": "ru' ])
+    done_entry, todo_entry = json.loads(lines[0]), json.loads(lines[2])
+    for entry in [ done_entry, todo_entry ]:
+        shutil.rmtree(os.path.join(mlflow_context.output_dir, entry["experiment_id"], entry["run_id"]))
+
+    res = export_experiments(mlflow_context.client_src, exp_names, mlflow_context.output_dir, resume=True)
+    assert res["ok_runs"] == 4
+    assert not os.path.exists(os.path.join(mlflow_context.output_dir, done_entry["experiment_id"], done_entry["run_id"]))
+    assert os.path.exists(os.path.join(mlflow_context.output_dir, todo_entry["experiment_id"], todo_entry["run_id"]))
+    for exp in exps:
+        dct = io_utils.read_file_mlflow(os.path.join(mlflow_context.output_dir, exp.experiment_id, "experiment.json"))
+        assert len(dct["runs"]) == 2
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [ json.loads(line) for line in f ]
+    assert len(entries) == 4
+
+
+from mlflow_export_import.bulk.import_id_map import ImportIdMap, MappedRunInfo
+
+def test_import_id_map_resume(mlflow_context):
+    dir = os.path.join(mlflow_context.output_dir, "id_map")
+    id_map = ImportIdMap(dir)
+    id_map.add_experiment("1", "11")
+    id_map.add_run("r1", "1", MappedRunInfo("dr1", "uri1"))
+    id_map.add_run("r2", "1", MappedRunInfo("dr2", "uri2"), "r1")
+    id_map.add_model_version("model", 1, 3)
+    id_map.close()
+
+    id_map = ImportIdMap(dir, resume=True)
+    assert not id_map.is_experiment_completed("1")
+    assert id_map.get_runs("1") == { "r1": (MappedRunInfo("dr1", "uri1"), None), "r2": (MappedRunInfo("dr2", "uri2"), "r1") }
+    assert id_map.get_model_version("model", 1) == "3"
+    assert id_map.get_model_version("model", 2) is None
+    id_map.complete_experiment("1")
+    assert id_map.is_experiment_completed("1")
+    id_map.close()
+
+    id_map = ImportIdMap(dir, resume=False)
+    assert id_map.get_runs("1") == {}
+    assert not id_map.has_model_versions("model")
+    id_map.close()
+
+
+# == Tests for experiment name patterns
+
+from mlflow.exceptions import MlflowException
+from oss_utils_test import mk_uuid
+
+def test_get_experiment_ids_from_pattern(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    prefix = f"test_exim_{mk_uuid()[:8]}"
+    exps = [ create_test_experiment(mlflow_context.client_src, 1, lambda: f"{prefix}_{j}") for j in range(3) ]
+    create_test_experiment(mlflow_context.client_src, 1)
+    exp_ids = bulk_utils.get_experiment_ids(mlflow_context.client_src, f"{prefix}_*")
+    assert sorted(exp_ids) == sorted(exp.experiment_id for exp in exps)
+    exp_ids = bulk_utils.get_experiment_ids(mlflow_context.client_src, f"{prefix}_[01],{prefix}_?")
+    assert sorted(exp_ids[:2]) == sorted([ exps[0].experiment_id, exps[1].experiment_id ])
+    assert exp_ids[2] == exps[2].experiment_id
+
+
+def test_mk_like_filter():
+    assert bulk_utils._mk_like_filter("team_a*") == "name LIKE 'team_a%'"
+    assert bulk_utils._mk_like_filter("team_?_prod*") == "name LIKE 'team___prod%'"
+    assert bulk_utils._mk_like_filter("team_[ab]_prod") == "name LIKE 'team_%'"
+    assert bulk_utils._mk_like_filter("*") is None
+    assert bulk_utils._mk_like_filter("it's*") is None
+
+
+def test_pattern_fallback():
+    filters = []
+    def list_entities(filter):
+        filters.append(filter)
+        if filter:
+            raise MlflowException("Bad filter")
+        return [ ("1", "team_a1"), ("2", "team_b1"), ("3", "team_a2") ]
+    assert bulk_utils._get_list("team_a*", list_entities) == [ "1", "3" ]
+    assert filters == [ "name LIKE 'team_a%'", None ]
@@ -144,3 +144,57 @@ def test_get_model_names_from_all_string(mlflow_context):
     model_names1 = [ create_model(mlflow_context.client_src) for j in range(0,3) ]
     model_names2 = bulk_utils.get_model_names(mlflow_context.client_src, "*")
     assert set(model_names1) == set(model_names2)
+
+
+# == Test for the experiments and runs of model versions
+
+from mlflow_export_import.bulk import model_utils
+from mlflow_export_import.bulk.model_utils import get_experiments_runs_of_models
+
+def test_get_experiments_runs_of_models(mlflow_context, monkeypatch):
+    delete_experiments_and_models(mlflow_context)
+    client = mlflow_context.client_src
+    model_names = [ create_model(client) for j in range(0,num_models) ]
+    create_model(client) # not requested
+    exps_and_runs = get_experiments_runs_of_models(client, model_names, max_workers=4)
+    expected = {}
+    for model_name in model_names:
+        for vr in client.search_model_versions(f"name='{model_name}'"):
+            expected.setdefault(client.get_run(vr.run_id).info.experiment_id, set()).add(vr.run_id)
+    assert { exp_id: set(run_ids) for exp_id,run_ids in exps_and_runs.items() } == expected
+    monkeypatch.setattr(model_utils, "GLOBAL_SCAN_MIN_MODELS", 1)
+    exps_and_runs = get_experiments_runs_of_models(client, model_names, max_workers=4)
+    assert { exp_id: set(run_ids) for exp_id,run_ids in exps_and_runs.items() } == expected
+
+
+def test_get_model_names_from_pattern(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    model_names1 = [ create_model(mlflow_context.client_src) for j in range(0,2) ]
+    mlflow_context.client_src.create_registered_model("other_model")
+    model_names2 = bulk_utils.get_model_names(mlflow_context.client_src, f"{model_names1[0][:-3]}*,{model_names1[1]}")
+    assert model_names1[0] in model_names2
+    assert model_names1[1] in model_names2
+    assert "other_model" not in model_names2
+
+
+# == Test for resuming an interrupted import
+
+import sqlite3
+from mlflow_export_import.bulk.import_id_map import ID_MAP_FILE
+
+def test_import_resume(mlflow_context):
+    delete_experiments_and_models(mlflow_context)
+    model_name = create_model(mlflow_context.client_src)
+    export_models(mlflow_context.client_src, [ model_name ], mlflow_context.output_dir, stages="None")
+    import_all(mlflow_context.client_dst, mlflow_context.output_dir, delete_model=True)
+    num_versions = len(mlflow_context.client_dst.search_model_versions(f"name='{model_name}'"))
+    dst_run_ids = { vr.run_id for vr in mlflow_context.client_dst.search_model_versions(f"name='{model_name}'") }
+
+    # Simulate a crash after the last version was created but before it was recorded
+    with sqlite3.connect(os.path.join(mlflow_context.output_dir, ID_MAP_FILE)) as conn:
+        conn.execute("DELETE FROM model_versions WHERE dst_version = (SELECT MAX(CAST(dst_version AS INTEGER)) FROM model_versions)")
+    import_all(mlflow_context.client_dst, mlflow_context.output_dir, delete_model=True, resume=True)
+
+    versions = mlflow_context.client_dst.search_model_versions(f"name='{model_name}'")
+    assert len(versions) == num_versions
+    assert { vr.run_id for vr in versions } == dst_run_ids
@@ -51,3 +51,28 @@ def test_exp_with_source_tags(mlflow_context):
     compare_runs(mlflow_context.client_src, mlflow_context.client_dst, run1, run2, 
         mlflow_context.output_dir, 
         import_source_tags=True)
+
+
+# == Test for concurrent run export
+
+import os
+import mlflow
+from mlflow_export_import.common import io_utils
+
+def test_exp_run_workers(mlflow_context):
+    init_output_dirs(mlflow_context.output_dir)
+    exp, _ = create_simple_run(mlflow_context.client_src)
+    for j in range(0,5):
+        with mlflow.start_run(run_name=f"run_{j}"):
+            mlflow.log_metric("m1", j)
+    dir1 = os.path.join(mlflow_context.output_dir, "exp_run_workers_1")
+    dir2 = os.path.join(mlflow_context.output_dir, "exp_run_workers_4")
+    res1 = ExperimentExporter(mlflow_context.client_src).export_experiment(exp.name, dir1)
+    res2 = ExperimentExporter(mlflow_context.client_src, run_workers=4).export_experiment(exp.name, dir2)
+    assert res1 == res2 == (6, 0)
+    dct1 = io_utils.read_file(os.path.join(dir1, "experiment.json"))
+    dct2 = io_utils.read_file(os.path.join(dir2, "experiment.json"))
+    assert io_utils.get_info(dct1) == io_utils.get_info(dct2)
+    assert io_utils.get_mlflow(dct1)["runs"] == io_utils.get_mlflow(dct2)["runs"]
+    for run_id in io_utils.get_mlflow(dct2)["runs"]:
+        assert os.path.exists(os.path.join(dir2, run_id, "run.json"))
@@ -0,0 +1,54 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from mlflow_export_import.client.http_client import MlflowHttpClient, get_mlflow_http_client
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    """ Returns HTTP 429 with 'Retry-After' for the first two requests. """
+    protocol_version = "HTTP/1.1"
+    ports = []
+
+    def do_GET(self):
+        self.ports.append(self.client_address[1])
+        if len(self.ports) <= 2:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_retry_and_keep_alive():
+    server = ThreadingHTTPServer(("localhost", 0), _ThrottlingHandler) # handler threads are daemon threads
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = MlflowHttpClient(f"http://localhost:{server.server_port}")
+        assert client.get("experiments/search") == { "ok": True }
+        assert len(_ThrottlingHandler.ports) == 3
+        client.get("experiments/search")
+        assert len(set(_ThrottlingHandler.ports)) == 1 # one pooled connection
+    finally:
+        server.shutdown()
+
+
+def test_shared_client():
+    assert get_mlflow_http_client() is get_mlflow_http_client()
+
+
+def test_set_pool_size():
+    from mlflow_export_import.client import http_client
+    session = http_client.get_session()
+    http_client.set_pool_size(1)
+    assert http_client.get_session() is session
+    pool_size = http_client._session_pool_size
+    http_client.set_pool_size(pool_size + 1)
+    assert http_client.get_session() is not session
+    assert http_client._session_pool_size == pool_size + 1
@@ -165,3 +165,59 @@ def test_SearchRegisteredModelsIterator_like(mlflow_context):
     filter = f"name like '{new_prefix}%'"
     models2 = SearchRegisteredModelsIterator(mlflow_context.client_src, max_results, filter)
     assert 4 == len(list(models2))
+
+# ==== Prefetching
+
+def test_SearchRunsIterator_prefetch(mlflow_context):
+    num_runs = 50
+    max_results = 7
+    exp = _create_runs(mlflow_context.client_src, num_runs)
+    runs1 = list(SearchRunsIterator(mlflow_context.client_src, exp.experiment_id, max_results))
+    runs2 = list(SearchRunsIterator(mlflow_context.client_src, exp.experiment_id, max_results, prefetch=2))
+    assert [ run.info.run_id for run in runs1 ] == [ run.info.run_id for run in runs2 ]
+
+def test_SearchRunsIterator_prefetch_empty(mlflow_context):
+    exp = _create_runs(mlflow_context.client_src, 0)
+    assert list(SearchRunsIterator(mlflow_context.client_src, exp.experiment_id, 22, prefetch=2)) == []
+
+def test_SearchRegisteredModelsIterator_server_max_results(mlflow_context):
+    iterator = SearchRegisteredModelsIterator(mlflow_context.client_src, 5000)
+    assert iterator.max_results == SearchRegisteredModelsIterator.server_max_results
+
+def test_prefetch_error():
+    import pytest
+    class Client():
+        def search_registered_models(self, filter, max_results, page_token=None):
+            raise mlflow.exceptions.MlflowException("Cannot search")
+    with pytest.raises(mlflow.exceptions.MlflowException):
+        list(SearchRegisteredModelsIterator(Client(), prefetch=2))
+
+class _EndlessClient():
+    def __init__(self):
+        self.calls = 0
+    def search_registered_models(self, filter, max_results, page_token=None):
+        from mlflow.store.entities.paged_list import PagedList
+        self.calls += 1
+        return PagedList([ self.calls ], token=str(self.calls))
+
+def _assert_stopped(client):
+    import time
+    time.sleep(1.5)
+    calls = client.calls
+    time.sleep(1.0)
+    assert client.calls == calls
+
+def test_prefetch_close():
+    client = _EndlessClient()
+    with SearchRegisteredModelsIterator(client, prefetch=2) as models:
+        for model in models:
+            if model == 3:
+                break
+    _assert_stopped(client)
+
+def test_prefetch_close_on_gc():
+    client = _EndlessClient()
+    for model in SearchRegisteredModelsIterator(client, prefetch=2):
+        if model == 3:
+            break
+    _assert_stopped(client)
@@ -0,0 +1,40 @@
+import threading
+from mlflow_export_import.common.metadata_cache import LruCache, MetadataCache
+
+
+def test_lru_eviction():
+    cache = LruCache(2)
+    assert cache.get("a", str.upper) == "A"
+    assert cache.get("b", str.upper) == "B"
+    assert cache.get("a", lambda key: "new") == "A" # 'b' is now least recently used
+    assert cache.get("c", str.upper) == "C"
+    assert len(cache) == 2
+    assert cache.get("b", lambda key: "new") == "new"
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_concurrent_gets():
+    cache = LruCache(10)
+    def get():
+        for j in range(100):
+            cache.get(j % 5, lambda key: key * 2)
+    threads = [ threading.Thread(target=get) for _ in range(4) ]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert cache.hits + cache.misses == 400
+    assert len(cache) == 5
+
+
+def test_metadata_cache():
+    class Client():
+        def __init__(self):
+            self.num_calls = 0
+        def get_experiment(self, experiment_id):
+            self.num_calls += 1
+            return f"exp_{experiment_id}"
+    client = Client()
+    cache = MetadataCache(client)
+    for _ in range(3):
+        assert cache.get_experiment("1") == "exp_1"
+    assert client.num_calls == 1
+    assert cache.get_stats()["experiments"] == { "hits": 2, "misses": 1 }
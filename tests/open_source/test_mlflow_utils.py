@@ -0,0 +1,33 @@
+from mlflow_export_import.common.mlflow_utils import ExperimentResolver
+from oss_utils_test import create_experiment
+from init_tests import mlflow_context
+
+
+class _CountingClient():
+    def __init__(self, mlflow_client):
+        self.mlflow_client = mlflow_client
+        self.num_calls = 0
+
+    def __getattr__(self, name):
+        self.num_calls += 1
+        return getattr(self.mlflow_client, name)
+
+
+def test_experiment_resolver(mlflow_context):
+    exp = create_experiment(mlflow_context.client_src)
+    client = _CountingClient(mlflow_context.client_src)
+    resolver = ExperimentResolver(client, None)
+    for _ in range(3):
+        assert resolver.set_experiment(exp.name).experiment_id == exp.experiment_id
+    assert client.num_calls == 2
+
+
+def test_create_workspace_dir_once():
+    class DbxClient():
+        paths = []
+        def post(self, resource, data):
+            self.paths.append(data["path"])
+    resolver = ExperimentResolver(None, DbxClient())
+    for _ in range(3):
+        resolver.create_workspace_dir("/Users/me/notebooks")
+    assert DbxClient.paths == [ "/Users/me/notebooks" ]
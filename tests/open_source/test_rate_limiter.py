@@ -0,0 +1,61 @@
+import time
+import pytest
+from mlflow.exceptions import MlflowException
+from mlflow.protos.databricks_pb2 import REQUEST_LIMIT_EXCEEDED
+from mlflow_export_import.common import rate_limiter
+from mlflow_export_import.common.rate_limiter import AdaptiveRateLimiter
+
+
+def _throttled():
+    raise MlflowException("Too many requests", error_code=REQUEST_LIMIT_EXCEEDED)
+
+
+def test_unlimited_by_default():
+    limiter = AdaptiveRateLimiter("test")
+    start = time.monotonic()
+    for _ in range(1000):
+        limiter.call(lambda: None)
+    assert limiter.rate is None
+    assert time.monotonic() - start < 1.0
+
+
+def test_start_at_ceiling():
+    limiter = AdaptiveRateLimiter("test", max_rate=4)
+    assert limiter.rate == 4
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 4
+
+
+def test_throttle_unlimited():
+    limiter = AdaptiveRateLimiter("test")
+    for _ in range(40):
+        limiter.call(lambda: None)
+    with pytest.raises(MlflowException):
+        limiter.call(_throttled)
+    assert limiter.rate == 20.5 # half of the 41 calls of the last second
+
+
+def test_decrease_on_throttling():
+    limiter = AdaptiveRateLimiter("test", max_rate=100)
+    with pytest.raises(MlflowException):
+        limiter.call(_throttled)
+    assert limiter.rate == 50
+    with pytest.raises(MlflowException): # cut only once per cooldown
+        limiter.call(_throttled)
+    assert limiter.rate == 50
+
+
+def test_parse_max_rates():
+    assert rate_limiter.parse_max_rates("default=100, log_batch=20") == { "default": 100.0, "log_batch": 20.0 }
+    with pytest.raises(Exception):
+        rate_limiter.parse_max_rates("default")
+
+
+def test_rate_limited_client():
+    class Client():
+        def log_batch(self, run_id):
+            return run_id
+    client = rate_limiter.limit_client(Client())
+    assert client.log_batch("123") == "123"
+    assert rate_limiter.limit_client(client) is client
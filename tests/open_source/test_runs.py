@@ -83,3 +83,184 @@ def test_model_predictions(mlflow_context):
     predictions1 = model1.predict(X_test)
     predictions2 = model2.predict(X_test)
     assert np.array_equal(predictions1, predictions2)
+
+
+# == Test for concurrent metric history fetch
+
+from mlflow_export_import.common import io_utils
+import os
+
+def test_run_metric_workers(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src, use_metric_steps=True)
+    dir1 = os.path.join(mlflow_context.output_dir, "run_metric_workers_1")
+    dir2 = os.path.join(mlflow_context.output_dir, "run_metric_workers_4")
+    RunExporter(mlflow_context.client_src).export_run(run.info.run_id, dir1)
+    RunExporter(mlflow_context.client_src, metric_workers=4).export_run(run.info.run_id, dir2)
+    metrics1 = io_utils.read_file_mlflow(os.path.join(dir1, "run.json"))["metrics"]
+    metrics2 = io_utils.read_file_mlflow(os.path.join(dir2, "run.json"))["metrics"]
+    assert list(metrics1.keys()) == list(metrics2.keys())
+    assert metrics1 == metrics2
+    assert len(metrics2["rmse"]) == 5
+
+
+# == Test for metric histories in sidecar files
+
+from mlflow_export_import.run import metric_history
+
+def _run_test_metrics_format(mlflow_context, metrics_format):
+    _, run = create_simple_run(mlflow_context.client_src, use_metric_steps=True)
+    dir1 = os.path.join(mlflow_context.output_dir, "run_metrics_format_json")
+    dir2 = os.path.join(mlflow_context.output_dir, f"run_metrics_format_{metrics_format}")
+    RunExporter(mlflow_context.client_src).export_run(run.info.run_id, dir1)
+    RunExporter(mlflow_context.client_src, metrics_format=metrics_format).export_run(run.info.run_id, dir2)
+    metrics1 = io_utils.read_file_mlflow(os.path.join(dir1, "run.json"))["metrics"]
+    dct2 = io_utils.read_file(os.path.join(dir2, "run.json"))
+    assert io_utils.get_info(dct2)["metrics_format"] == metrics_format
+    metrics2 = io_utils.get_mlflow(dct2)["metrics"]
+    assert metrics1.keys() == metrics2.keys()
+    for key,steps in metrics2.items():
+        assert metric_history.is_metric_pointer(steps)
+        assert steps["num_steps"] == len(metrics1[key])
+        assert list(metric_history.read_metric_history(dir2, steps)) == metrics1[key]
+
+
+def test_run_metrics_format_jsonl(mlflow_context):
+    _run_test_metrics_format(mlflow_context, "jsonl")
+
+
+def test_run_metrics_format_npy(mlflow_context):
+    _run_test_metrics_format(mlflow_context, "npy")
+
+
+# == Test for parallel artifact download
+
+from mlflow_export_import.common import artifact_transfer
+
+def test_run_artifact_workers(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src)
+    dir1 = os.path.join(mlflow_context.output_dir, "run_artifact_workers_1")
+    dir2 = os.path.join(mlflow_context.output_dir, "run_artifact_workers_4")
+    RunExporter(mlflow_context.client_src).export_run(run.info.run_id, dir1)
+    RunExporter(mlflow_context.client_src, artifact_workers=4).export_run(run.info.run_id, dir2)
+    files = artifact_transfer.list_artifact_files(mlflow_context.client_src, run.info.run_id)
+    for info in files:
+        path1 = os.path.join(dir1, "artifacts", info.path)
+        path2 = os.path.join(dir2, "artifacts", info.path)
+        assert os.path.getsize(path2) == info.file_size
+        with open(path1, "rb") as f1, open(path2, "rb") as f2:
+            assert f1.read() == f2.read()
+    assert sorted(os.listdir(os.path.join(dir1, "artifacts"))) == sorted(os.listdir(os.path.join(dir2, "artifacts")))
+
+
+def test_run_artifacts_resume(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src)
+    dst_path = os.path.join(mlflow_context.output_dir, "run_artifacts_resume")
+    num_downloaded, num_skipped = artifact_transfer.download_artifacts(mlflow_context.client_src, run.info.run_id, dst_path, 2)
+    assert num_downloaded > 0 and num_skipped == 0
+    os.remove(os.path.join(dst_path, "info.txt"))
+    assert artifact_transfer.download_artifacts(mlflow_context.client_src, run.info.run_id, dst_path, 2) == (1, num_downloaded-1)
+    assert not [ f for f in os.listdir(dst_path) if f.startswith(".tmp") ]
+    assert not [ f for f in os.listdir(mlflow_context.output_dir) if f.startswith(".tmp") ]
+
+
+def test_run_artifacts_stale_tmp_dirs(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src)
+    dst_path = os.path.join(mlflow_context.output_dir, "run_artifacts_stale_tmp_dirs")
+    stale_dir = os.path.join(dst_path, ".tmp-download-0123", "model")
+    os.makedirs(stale_dir)
+    with open(os.path.join(stale_dir, "model.pkl"), "w") as f:
+        f.write("torn")
+    dst_run = mlflow_context.client_src.create_run(run.info.experiment_id)
+    num_files, _, _ = artifact_transfer.upload_artifacts(dst_run.info.artifact_uri, dst_path)
+    assert num_files == 0
+    artifact_transfer.download_artifacts(mlflow_context.client_src, run.info.run_id, dst_path)
+    assert not [ f for f in os.listdir(dst_path) if f.startswith(".tmp") ]
+
+
+# == Test for parallel artifact upload
+
+def test_run_upload_artifacts(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src)
+    src_path = os.path.join(mlflow_context.output_dir, "run_upload_artifacts")
+    artifact_transfer.download_artifacts(mlflow_context.client_src, run.info.run_id, src_path)
+    dst_run = mlflow_context.client_src.create_run(run.info.experiment_id)
+    num_files, num_bytes, _ = artifact_transfer.upload_artifacts(dst_run.info.artifact_uri, src_path, 4)
+    src_files = artifact_transfer.list_artifact_files(mlflow_context.client_src, run.info.run_id)
+    dst_files = artifact_transfer.list_artifact_files(mlflow_context.client_src, dst_run.info.run_id)
+    assert num_files == len(src_files)
+    assert num_bytes == sum(info.file_size for info in src_files)
+    assert sorted((info.path, info.file_size) for info in src_files) == sorted((info.path, info.file_size) for info in dst_files)
+
+
+# == Test for MLmodel run ID fix in a staging directory
+
+def test_run_stage_mlmodel_files(mlflow_context):
+    _, run = create_simple_run(mlflow_context.client_src)
+    path = os.path.join(mlflow_context.output_dir, "run_stage_mlmodel_files")
+    artifact_transfer.download_artifacts(mlflow_context.client_src, run.info.run_id, path)
+    src_mlmodel_path = os.path.join(path, "model", "MLmodel")
+    src_mlmodel = io_utils.read_file(src_mlmodel_path, "yaml")
+    dst_run = mlflow_context.client_src.create_run(run.info.experiment_id)
+    importer = RunImporter(mlflow_context.client_src)
+    importer._upload_artifacts(dst_run, path)
+    assert io_utils.read_file(src_mlmodel_path, "yaml") == src_mlmodel
+    local_path = mlflow_context.client_src.download_artifacts(dst_run.info.run_id, "model/MLmodel")
+    dst_mlmodel = io_utils.read_file(local_path, "yaml")
+    assert dst_mlmodel["run_id"] == dst_run.info.run_id
+    assert { **dst_mlmodel, "run_id": src_mlmodel["run_id"] } == src_mlmodel
+
+
+# == Test for notebook upload deduplication
+
+class _DbxClient():
+    def __init__(self):
+        self.calls = []
+    def post(self, resource, data):
+        self.calls.append(resource)
+    def _post(self, resource, data):
+        self.calls.append(resource)
+
+def test_upload_databricks_notebook_once(mlflow_context):
+    input_dir = os.path.join(mlflow_context.output_dir, "run_upload_notebook")
+    os.makedirs(os.path.join(input_dir, "artifacts", "notebooks"))
+    with open(os.path.join(input_dir, "artifacts", "notebooks", "my_notebook.source"), "w", encoding="utf-8") as f:
+        f.write("print('hello')")
+    src_run_dct = { "info": { "run_id": "123" }, "tags": { "mlflow.databricks.notebookPath": "/Users/me/my_notebook" } }
+    importer = RunImporter(mlflow_context.client_dst)
+    importer.dbx_client = importer.experiment_resolver.dbx_client = _DbxClient()
+    for _ in range(3):
+        importer._upload_databricks_notebook(input_dir, src_run_dct, "/Users/me/imported")
+    importer._upload_databricks_notebook(input_dir, src_run_dct, "/Users/me/imported/456")
+    assert importer.dbx_client.calls == [ "workspace/mkdirs", "workspace/import", "workspace/mkdirs", "workspace/import" ]
+
+
+# == Test for the notebook export cache
+
+from mlflow_export_import.notebook.download_notebook import download_notebook, NotebookCache
+
+class _NotebookDbxClient():
+    def __init__(self):
+        self.formats = []
+    def _get(self, resource, params):
+        self.formats.append(params["format"])
+        class Response():
+            content = f"notebook {params['path']} {params['format']}".encode()
+        return Response()
+
+def test_download_notebook_cache(mlflow_context):
+    dbx_client = _NotebookDbxClient()
+    cache = NotebookCache()
+    formats = [ "SOURCE", "DBC" ]
+    dir1 = os.path.join(mlflow_context.output_dir, "notebook_cache_1")
+    dir2 = os.path.join(mlflow_context.output_dir, "notebook_cache_2")
+    download_notebook(dir1, "/Users/me/my_notebook", "100", formats, dbx_client, cache)
+    download_notebook(dir2, "/Users/me/my_notebook", "100", formats, dbx_client, cache)
+    assert sorted(dbx_client.formats) == [ "DBC", "SOURCE" ]
+    assert (cache.hits, cache.misses) == (2, 2)
+    for ext in [ "source", "dbc" ]:
+        with open(os.path.join(dir2, f"my_notebook.{ext}"), "rb") as f:
+            assert f.read() == f"notebook /Users/me/my_notebook {ext.upper()}".encode()
+    download_notebook(dir2, "/Users/me/my_notebook", "101", formats, dbx_client, cache)
+    assert len(dbx_client.formats) == 4
+    with open(os.path.join(dir1, "my_notebook.source"), "rb") as f:
+        assert f.read() == b"notebook /Users/me/my_notebook SOURCE"